@@ -3,50 +3,64 @@ import librosa as lr
 import numpy as np
 import soundfile as sf
 import webrtcvad
+import os
+import soxr
+import tempfile
+
+import instrumentation
+from audioProcess import vad
+from audioProcess.filters import designFirCached, designIirCached, fftFiltfilt
+from audioProcess.streaming import (ActiveRmsAccumulator, FirZeroPhaseStream, IirStream, VadGateStream,
+                                    decodeAudio, decodeBlocks)
 
 
 class AudioProcessor:
-    def __init__(self, audio_file_path):
+    def __init__(self, audio_file_path, streaming=False, sample_rate=16000, pcm_cache=None):
+
+        self.audio_file_path = audio_file_path
+        if streaming:
+            # Blocks are decoded on demand by processStreaming; nothing is held in memory.
+            self.input_audio, self.sample_audio_rate = None, sample_rate
+            return
 
-        self.input_audio, self.sample_audio_rate = lr.load(audio_file_path, sr=16000)
+        with instrumentation.stage('decode', audio_file_path, os.path.getsize(audio_file_path)):
+            if pcm_cache is not None:
+                self.input_audio, self.sample_audio_rate = pcm_cache.load(audio_file_path, sample_rate)
+            else:
+                self.input_audio, self.sample_audio_rate = decodeAudio(audio_file_path, sample_rate), sample_rate
 
-    def bandPassFilterIir(self, low_freq, high_freq, order=6, equalize=True):
+    def designIir(self, low_freq, high_freq, order=6, equalize=True):
 
-        if high_freq >= self.sample_audio_rate / 2:
-            high_freq = self.sample_audio_rate / 2 - 1.0
+        return designIirCached(self.sample_audio_rate, low_freq, high_freq, order, equalize)
 
-        sos = signal.iirfilter(order, [low_freq, high_freq], btype='bandpass', ftype='butter', output='sos', fs=self.sample_audio_rate)
-        iir_filtered_audio = signal.sosfilt(sos, self.input_audio)
+    def bandPassFilterIir(self, low_freq, high_freq, order=6, equalize=True, zero_phase=False):
+
+        sos, gain = self.designIir(low_freq, high_freq, order, equalize)
+        with instrumentation.stage('iir', self.audio_file_path, self.input_audio.nbytes):
+            if zero_phase:
+                # Forward-backward filtering squares the magnitude response, and with it the passband gain.
+                iir_filtered_audio = signal.sosfiltfilt(sos, self.input_audio)
+                gain = gain ** 2
+            else:
+                iir_filtered_audio = signal.sosfilt(sos, self.input_audio)
 
-        if equalize:
-            computedFrequencies, frequencyResponse = signal.freqz_sos(sos, worN=4096, fs=self.sample_audio_rate)
-            passband = (computedFrequencies >= low_freq*1.1) & (computedFrequencies <= high_freq*0.9)
-            gain = np.median(np.abs(frequencyResponse[passband])) if np.any(passband) else 1.0
-            if gain > 1e-12:
+            if gain != 1.0:
                 iir_filtered_audio = iir_filtered_audio / gain
 
         return iir_filtered_audio
 
-    def bandPassFilterFir(self, low_freq, high_freq, numtaps=401, equalize=True):
+    def designFir(self, low_freq, high_freq, numtaps=401, equalize=True, window=('kaiser', 8.0)):
 
-        if high_freq >= self.sample_audio_rate / 2:
-            high_freq = self.sample_audio_rate / 2 - 1.0
+        return designFirCached(self.sample_audio_rate, low_freq, high_freq, numtaps, window, equalize)
 
-        fir_coeff = signal.firwin(numtaps, [low_freq, high_freq], window=('kaiser', 8.0), pass_zero=False, fs=self.sample_audio_rate)
-        w, h = signal.freqz(fir_coeff, worN=4096, fs=self.sample_audio_rate)
-        pb = (w >= 500) & (w <= 2500)
-        g = np.mean(np.abs(h[pb])) + 1e-12
-        fir_coeff /= g
-        # fir_filtered_audio = signal.lfilter(fir_coeff, 1.0, self.input_audio)
+    def bandPassFilterFir(self, low_freq, high_freq, numtaps=401, equalize=True, method='fft'):
 
-        if equalize:
-            computedFrequencies, frequencyResponse = signal.freqz(fir_coeff, worN=4096, fs=self.sample_audio_rate)
-            passband = (computedFrequencies >= low_freq*1.1) & (computedFrequencies <= high_freq*0.9)
-            gain = np.median(np.abs(frequencyResponse[passband])) if np.any(passband) else 1.0
-            if gain > 1e-12:
-                fir_coeff = fir_coeff / gain
-
-        fir_filtered_audio = signal.filtfilt(fir_coeff, [1.0], self.input_audio)
+        fir_coeff = self.designFir(low_freq, high_freq, numtaps, equalize)
+        with instrumentation.stage('fir', self.audio_file_path, self.input_audio.nbytes):
+            if method == 'fft':
+                fir_filtered_audio = fftFiltfilt(fir_coeff, self.input_audio)
+            else:
+                fir_filtered_audio = signal.filtfilt(fir_coeff, [1.0], self.input_audio)
 
         return fir_filtered_audio
     
@@ -55,6 +69,10 @@ class AudioProcessor:
         return float(np.sqrt(np.mean(np.square(input_signal), dtype=np.float64)) + 1e-12)
 
     def loudnessNormalizeAdaptive(self, input_audio, sample_rate, target_dbfs = -20.0, top_db = 25.0):
+        with instrumentation.stage('normalize', self.audio_file_path, input_audio.nbytes):
+            return self._loudnessNormalizeAdaptive(input_audio, target_dbfs, top_db)
+
+    def _loudnessNormalizeAdaptive(self, input_audio, target_dbfs, top_db):
         intervals = lr.effects.split(input_audio, top_db=top_db)
         if len(intervals) == 0:
             current_rms = self.rms(input_audio)
@@ -81,61 +99,148 @@ class AudioProcessor:
     def resample_to_16k(self, input_audio, sample_rate_input, sample_rate_output=16000):
         if sample_rate_input == sample_rate_output:
             return input_audio
-        y16 = lr.resample(input_audio, orig_sr=sample_rate_input, target_sr=sample_rate_output, res_type="kaiser_best")
+        with instrumentation.stage('resample', self.audio_file_path, input_audio.nbytes):
+            y16 = lr.resample(input_audio, orig_sr=sample_rate_input, target_sr=sample_rate_output, res_type="kaiser_best")
         return y16
 
 
-    def writeFilteredAudio(self, output_file_path, filtered_audio):
-        sf.write(output_file_path, filtered_audio, self.sample_audio_rate)
-        print(f"Filtered audio written to {output_file_path}")
+    def writeFilteredAudio(self, output_file_path, filtered_audio, announce=True):
+        """Write the audio at `sample_audio_rate`; `announce=False` skips the log line (e.g. for a temporary path)."""
+        with instrumentation.stage('write', self.audio_file_path, filtered_audio.nbytes):
+            sf.write(output_file_path, filtered_audio, self.sample_audio_rate)
+        if announce:
+            instrumentation.log(f"Filtered audio written to {output_file_path}")
 
     def vadGate(self, input_audio, sample_rate, frame_ms, mode, hang_ms, atten_db):
 
+        with instrumentation.stage('vad', self.audio_file_path, input_audio.nbytes):
+            return self._vadGate(input_audio, sample_rate, frame_ms, mode, hang_ms, atten_db)
+
+    def _vadGate(self, input_audio, sample_rate, frame_ms, mode, hang_ms, atten_db):
+
         assert frame_ms in (10, 20, 30) and sample_rate in (8000, 16000, 32000, 48000)
         
         frame_len = int(sample_rate * frame_ms / 1000)
+        frame_flags = vad.frameFlags(input_audio, sample_rate, frame_len, webrtcvad.Vad(mode))
 
-        pad = (frame_len - (len(input_audio) % frame_len)) % frame_len
-        output = np.pad(input_audio, (0, pad)) if pad else input_audio
-
-        int16_output = (np.clip(output, -1.0, 1.0) * 32767).astype(np.int16)
-        vad = webrtcvad.Vad(mode)
-
-        num_frames = len(int16_output) // frame_len
-        frame_flags = np.zeros((num_frames,), dtype=bool)
-        for i in range(num_frames):
-            frame = int16_output[i * frame_len:(i + 1) * frame_len].tobytes()
-            frame_flags[i] = vad.is_speech(frame, sample_rate)
-
-        
         hang = max(0, int(round(hang_ms / frame_ms)))
-        if hang > 0:
-            kernel = np.ones(2*hang + 1, dtype=int)
-            smoothed = np.convolve(frame_flags.astype(int), kernel, mode='same') > 0
-            frame_flags = smoothed
+        frame_flags = vad.hangover(frame_flags, hang)
 
-        mask = np.repeat(frame_flags, frame_len)[:len(int16_output)]
+        mask = vad.flagsToMask(frame_flags, frame_len, len(input_audio))
 
         att = 10 ** (-atten_db / 20.0)
-        squelch_output = output.copy()
+        squelch_output = np.array(input_audio, copy=True)
         squelch_output[~mask] *= att
 
-        segments = []
-        if frame_flags.any():
-            i = 0
-            while i < num_frames:
-                if frame_flags[i]:
-                    start = i 
-                    while i < num_frames and frame_flags[i]:
-                        i += 1
-                    end = i
-                    t0 = start * frame_ms / 1000.0
-                    t1 = end * frame_ms / 1000.0
-                    segments.append((t0, t1))
-                else:
-                    i += 1
-
-        if pad:
-            squelch_output = squelch_output[:-pad]
+        segments = vad.flagsToSegments(frame_flags, frame_ms)
 
         return squelch_output, segments, frame_flags
+
+    def processFloat32(self, low_freq=250, high_freq=3400, filter_type='fir', numtaps=401, order=6, frame_ms=30, mode=3,
+                       hang_ms=150, atten_db=80, target_dbfs=-20.0, sample_rate_output=16000):
+        """Filter -> gate -> normalise -> resample kept in float32 with gain and gating applied in place.
+
+        Unlike `loudnessNormalizeAdaptive`, the active-speech RMS is taken over the speech frames the
+        gate already found (a running float64 sum, no concatenation) instead of `lr.effects.split`.
+        Returns (audio, gain, segments, frame_flags).
+        """
+        sample_rate = self.sample_audio_rate
+        with instrumentation.stage(filter_type, self.audio_file_path, self.input_audio.nbytes):
+            if filter_type == 'iir':
+                sos, gain = self.designIir(low_freq, high_freq, order)
+                audio = signal.sosfilt(sos.astype(np.float32), np.asarray(self.input_audio, dtype=np.float32))
+                if gain != 1.0:
+                    audio *= np.float32(1.0 / gain)
+            else:
+                audio = fftFiltfilt(self.designFir(low_freq, high_freq, numtaps), self.input_audio, dtype=np.float32)
+
+        with instrumentation.stage('vad', self.audio_file_path, audio.nbytes):
+            assert frame_ms in (10, 20, 30) and sample_rate in (8000, 16000, 32000, 48000)
+            frame_len = int(sample_rate * frame_ms / 1000)
+            frame_flags = vad.frameFlags(audio, sample_rate, frame_len, webrtcvad.Vad(mode))
+            frame_flags = vad.hangover(frame_flags, max(0, int(round(hang_ms / frame_ms))))
+            segments = vad.flagsToSegments(frame_flags, frame_ms)
+
+            # Speech frames are left untouched by the gate, so their energy can be measured before it.
+            energy, count = vad.speechEnergy(audio, frame_flags, frame_len)
+            if count == 0:
+                energy, count = vad.speechEnergy(audio, np.ones_like(frame_flags), frame_len)
+            vad.attenuateSilence(audio, frame_flags, frame_len, np.float32(10 ** (-atten_db / 20.0)))
+
+        with instrumentation.stage('normalize', self.audio_file_path, audio.nbytes):
+            current_rms = float(np.sqrt(energy / max(count, 1)) + 1e-12)
+            target_linear = 10.0 ** (target_dbfs / 20.0)
+            gain = 1.0 if current_rms < 1e-9 else target_linear / current_rms
+            peak = max(float(audio.max(initial=0.0)), -float(audio.min(initial=0.0))) * gain + 1e-12
+            audio *= np.float32(gain * (0.999 / peak) if peak > 0.999 else gain)
+
+        return self.resample_to_16k(audio, sample_rate, sample_rate_output), gain, segments, frame_flags
+
+    def processStreaming(self, output_file_path, low_freq=250, high_freq=3400, filter_type='fir', numtaps=401, order=6,
+                         frame_ms=30, mode=3, hang_ms=150, atten_db=80, target_dbfs=-20.0, top_db=25.0,
+                         sample_rate_output=16000, block_seconds=10.0, announce=True):
+        """Filter -> vadGate -> loudnessNormalizeAdaptive -> resample_to_16k -> write, in fixed-size blocks.
+
+        Memory stays bounded by the block size regardless of recording length: the gated signal is
+        spooled to a temporary float64 file while the loudness statistics accumulate, then read back to
+        apply the gain. Both paths decode the same samples (`decodeBlocks`/`decodeAudio`), so against
+        the whole-file methods the IIR path is bit-exact down to the written samples, and the FIR path
+        differs only within `numtaps` samples of either end (zero instead of odd-extension padding).
+        `announce=False` skips the log line, as for `writeFilteredAudio`. Returns (gain, segments, frame_flags).
+        """
+        with instrumentation.stage('streaming', self.audio_file_path, os.path.getsize(self.audio_file_path)):
+            result = self._processStreaming(output_file_path, low_freq, high_freq, filter_type, numtaps, order, frame_ms,
+                                            mode, hang_ms, atten_db, target_dbfs, top_db, sample_rate_output, block_seconds)
+        if announce:
+            instrumentation.log(f"Filtered audio written to {output_file_path}")
+        return result
+
+    def _processStreaming(self, output_file_path, low_freq, high_freq, filter_type, numtaps, order, frame_ms, mode, hang_ms,
+                          atten_db, target_dbfs, top_db, sample_rate_output, block_seconds):
+        if filter_type == 'iir':
+            sos, gain = self.designIir(low_freq, high_freq, order)
+            band_filter = IirStream(sos, gain)
+        else:
+            band_filter = FirZeroPhaseStream(self.designFir(low_freq, high_freq, numtaps))
+        gate = VadGateStream(self.sample_audio_rate, frame_ms, mode, hang_ms, atten_db)
+        stats = ActiveRmsAccumulator()
+
+        spool_fd, spool_path = tempfile.mkstemp(suffix='.f64', dir=os.path.dirname(os.path.abspath(output_file_path)))
+        try:
+            with os.fdopen(spool_fd, 'wb') as spool:
+                def spoolBlock(filtered):
+                    gated = gate.process(filtered)
+                    stats.update(gated)
+                    np.asarray(gated, dtype=np.float64).tofile(spool)
+
+                for block in decodeBlocks(self.audio_file_path, self.sample_audio_rate, block_seconds):
+                    spoolBlock(band_filter.process(block))
+                spoolBlock(band_filter.flush())
+                tail = gate.flush()
+                stats.update(tail)
+                np.asarray(tail, dtype=np.float64).tofile(spool)
+
+            current_rms = stats.activeRms(top_db)
+            target_linear = 10.0 ** (target_dbfs / 20.0)
+            gain = 1.0 if current_rms < 1e-9 else target_linear / current_rms
+            scale = gain
+            if stats.peak * gain + 1e-12 > 0.999:
+                scale = gain * (0.999 / (stats.peak * gain + 1e-12))
+
+            resampler = None
+            if self.sample_audio_rate != sample_rate_output:
+                resampler = soxr.ResampleStream(self.sample_audio_rate, sample_rate_output, 1, dtype='float64', quality='VHQ')
+
+            block_len = int(self.sample_audio_rate * block_seconds)
+            gated_audio = np.memmap(spool_path, dtype=np.float64, mode='r') if os.path.getsize(spool_path) else np.zeros(0)
+            with sf.SoundFile(output_file_path, 'w', samplerate=sample_rate_output, channels=1) as out_file:
+                for start in range(0, max(len(gated_audio), 1), block_len):
+                    block = gated_audio[start:start + block_len] * scale
+                    if resampler is not None:
+                        block = resampler.resample_chunk(block, last=start + block_len >= len(gated_audio))
+                    out_file.write(block)
+            del gated_audio
+        finally:
+            os.remove(spool_path)
+
+        return gain, gate.segments, gate.frameFlags()
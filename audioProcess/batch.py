@@ -0,0 +1,172 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import soundfile as sf
+
+import instrumentation
+from audioProcess.audioProcessing import AudioProcessor
+from audioProcess.pcmcache import PcmCache
+from audioProcess.speechstore import STORE_CODECS, indexPathFor, writeSpeechStore
+
+
+# The chain and parameters `main.py process` applies by default.
+DEFAULT_OPTIONS = {
+    'filter_type': 'fir',
+    'low_freq': 250,
+    'high_freq': 3400,
+    'frame_ms': 30,
+    'mode': 3,
+    'hang_ms': 150,
+    'atten_db': 80,
+    'target_dbfs': -20.0,
+    'top_db': 25.0,
+    'streaming': False,
+    'pcm_cache': False,
+    'output_format': 'wav',
+}
+# Options that change what is written; `streaming` and `pcm_cache` only change how it is computed.
+OUTPUT_OPTIONS = [key for key in DEFAULT_OPTIONS if key not in ('streaming', 'pcm_cache')]
+OPTIONS_SUFFIX = '.options.json'
+
+
+def discoverArchives(root='downloads', folder=None, station=None):
+    """MP3 archives under `root/<folder>/<station>/`, sorted."""
+    pattern = os.path.join(root, folder or '*', station or '*', '*.mp3')
+    return sorted(glob.glob(pattern))
+
+
+def outputPathFor(mp3_path, suffix=None, output_dir=None, output_format='wav', filter_type='fir'):
+    """`<stem><suffix><extension>`; the suffix defaults to the filter, e.g. `_fir` or `_iir`."""
+    stem, _ = os.path.splitext(os.path.basename(mp3_path))
+    directory = output_dir or os.path.dirname(mp3_path)
+    extension = STORE_CODECS[output_format][2] if output_format in STORE_CODECS else '.wav'
+    return os.path.join(directory, f"{stem}{suffix if suffix is not None else '_' + filter_type}{extension}")
+
+
+def optionsPathFor(output_path):
+    return output_path + OPTIONS_SUFFIX
+
+
+def outputOptions(options=None):
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    return {key: options[key] for key in OUTPUT_OPTIONS}
+
+
+def isUpToDate(mp3_path, output_path, options=None):
+    """True if `output_path` is newer than the archive and was written with the same output options.
+
+    The options of each output are kept next to it in `<output>.options.json`; outputs without one
+    (or when they differ) are stale.
+    """
+    if not os.path.exists(output_path) or os.path.getmtime(output_path) < os.path.getmtime(mp3_path):
+        return False
+    try:
+        with open(optionsPathFor(output_path)) as f:
+            return json.load(f) == outputOptions(options)
+    except (OSError, ValueError):
+        return False
+
+
+def processFile(mp3_path, output_path, options=None):
+    """Run the AudioProcessor chain on one archive, writing the result atomically. Runs in a worker process."""
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    started = time.monotonic()
+    directory, name = os.path.split(output_path)
+    os.makedirs(directory or '.', exist_ok=True)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp.wav")
+    # Speech-only stores (FLAC/Opus) get their own temporary file and index, renamed once both are complete.
+    store_format = options['output_format'] if options['output_format'] in STORE_CODECS else None
+    if store_format:
+        tmp_store = os.path.join(directory, f".{name}.{os.getpid()}.tmp{STORE_CODECS[store_format][2]}")
+        tmp_index = indexPathFor(tmp_store)
+    tmp_options = os.path.join(directory, f".{name}.{os.getpid()}.tmp{OPTIONS_SUFFIX}")
+    result = {'input': mp3_path, 'output': output_path, 'ok': False, 'segments': 0, 'seconds': 0.0, 'error': None}
+
+    with instrumentation.stage('file', mp3_path) as record:
+        try:
+            if options['streaming']:
+                processor = AudioProcessor(mp3_path, streaming=True)
+                _, segments, _ = processor.processStreaming(
+                    tmp_path, options['low_freq'], options['high_freq'], filter_type=options['filter_type'],
+                    frame_ms=options['frame_ms'], mode=options['mode'], hang_ms=options['hang_ms'],
+                    atten_db=options['atten_db'], target_dbfs=options['target_dbfs'], top_db=options['top_db'],
+                    announce=False)
+            else:
+                processor = AudioProcessor(mp3_path, pcm_cache=PcmCache() if options['pcm_cache'] else None)
+                sample_rate = processor.sample_audio_rate
+                if options['filter_type'] == 'iir':
+                    filtered = processor.bandPassFilterIir(options['low_freq'], options['high_freq'])
+                else:
+                    filtered = processor.bandPassFilterFir(options['low_freq'], options['high_freq'])
+                gated, segments, _ = processor.vadGate(filtered, sample_rate, frame_ms=options['frame_ms'], mode=options['mode'],
+                                                       hang_ms=options['hang_ms'], atten_db=options['atten_db'])
+                del filtered
+                normalized, _ = processor.loudnessNormalizeAdaptive(gated, sample_rate, target_dbfs=options['target_dbfs'],
+                                                                    top_db=options['top_db'])
+                del gated
+                output_audio = processor.resample_to_16k(normalized, sample_rate)
+                if store_format:
+                    with instrumentation.stage('store', mp3_path, output_audio.nbytes):
+                        writeSpeechStore(tmp_store, output_audio, 16000, segments, store_format, tmp_index)
+                else:
+                    # Logged once renamed: the temporary path is of no use to anyone reading the log.
+                    processor.writeFilteredAudio(tmp_path, output_audio, announce=False)
+
+            if store_format and os.path.exists(tmp_path):
+                # Streaming wrote the full-length WAV; keep only its speech.
+                with instrumentation.stage('store', mp3_path, os.path.getsize(tmp_path)), sf.SoundFile(tmp_path) as full:
+                    writeSpeechStore(tmp_store, full, full.samplerate, segments, store_format, tmp_index)
+            with open(tmp_options, 'w') as f:
+                json.dump(outputOptions(options), f)
+            if store_format:
+                os.replace(tmp_store, output_path)
+                os.replace(tmp_index, indexPathFor(output_path))
+            else:
+                os.replace(tmp_path, output_path)
+                instrumentation.log(f"Filtered audio written to {output_path}")
+            # Written last: an output whose options file is missing or older is reprocessed.
+            os.replace(tmp_options, optionsPathFor(output_path))
+            result['ok'] = True
+            result['segments'] = len(segments)
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            for path in [tmp_path, tmp_options] + ([tmp_store, tmp_index] if store_format else []):
+                if os.path.exists(path):
+                    os.remove(path)
+        record['bytes'] = os.path.getsize(output_path) if result['ok'] else 0
+
+    result['seconds'] = time.monotonic() - started
+    return result
+
+
+def runBatch(jobs, workers=None, options=None, max_in_flight=None, on_result=None):
+    """Process `(mp3_path, output_path)` jobs on a process pool, one file per worker.
+
+    At most `max_in_flight` files (default: twice the worker count) are submitted at once, so
+    results are collected as they finish and queued work never piles up in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    results = []
+
+    def collect(done):
+        for future in done:
+            result = future.result()
+            if on_result:
+                on_result(result)
+            results.append(result)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for mp3_path, output_path in jobs:
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(processFile, mp3_path, output_path, options))
+        collect(wait(pending).done)
+
+    return results
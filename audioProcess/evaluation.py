@@ -0,0 +1,256 @@
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import instrumentation
+from audioProcess.audioProcessing import AudioProcessor
+from audioProcess.batch import DEFAULT_OPTIONS
+from audioProcess.metrics import AudioMetrics
+from audioProcess.pcmcache import PcmCache
+
+
+PARAM_KEYS = ['filter_type', 'low_freq', 'high_freq', 'numtaps', 'order', 'frame_ms', 'mode', 'hang_ms', 'atten_db',
+              'target_dbfs', 'top_db']
+METRIC_KEYS = ['nsRmsInputDb', 'nsRmsOutputDb', 'nsReductionDb', 'spRmsInputDb', 'spRmsOutputDb', 'speechLevelDeltaDb',
+               'snrInput', 'snrOutput', 'snrDelta', 'lsdMeanDb', 'lsdMedDb', 'mfccMean', 'mfccMed']
+ROW_FIELDS = ['file', 'station', 'params'] + PARAM_KEYS + METRIC_KEYS + ['seconds', 'error']
+TEXT_FIELDS = {'file', 'station', 'params', 'filter_type', 'error'}
+INTEGER_FIELDS = {'files', 'errors', 'low_freq', 'high_freq', 'numtaps', 'order', 'frame_ms', 'mode', 'hang_ms', 'atten_db'}
+# Peak RSS of evaluateFile on a 32-minute archive is ~3.5 GB (decoded signal, filtered copies, spectral features).
+WORKER_MEMORY = 4 * 2**30
+PARAM_DEFAULTS = {**{key: DEFAULT_OPTIONS[key] for key in PARAM_KEYS if key in DEFAULT_OPTIONS}, 'numtaps': 401, 'order': 6}
+
+
+def parseGrid(specs):
+    """`['mode=2,3', 'hang_ms=150,300']` -> one parameter dict per combination, on top of the batch defaults."""
+    axes = []
+    for spec in specs or []:
+        key, _, values = spec.partition('=')
+        if key not in PARAM_KEYS:
+            raise ValueError(f"unknown parameter {key!r}; expected one of {', '.join(PARAM_KEYS)}")
+        kind = type(PARAM_DEFAULTS[key])
+        axes.append([(key, kind(value)) for value in values.split(',') if value])
+
+    param_sets = []
+    for combination in itertools.product(*axes):
+        params = {**PARAM_DEFAULTS, **dict(combination)}
+        params['params'] = ','.join(f"{key}={value}" for key, value in combination) or 'default'
+        param_sets.append(params)
+    return param_sets
+
+
+def evaluateFile(mp3_path, param_sets, use_pcm_cache=False):
+    """Run every parameter set on one archive and compare each output with the decoded original.
+
+    The archive is decoded once, the reference's VAD and spectral features are computed once (via
+    `referenceCache`) and each distinct band-pass filter runs once for all the VAD/normalisation
+    settings that share it. Runs in a worker process; returns one row per parameter set.
+    """
+    processor = AudioProcessor(mp3_path, pcm_cache=PcmCache() if use_pcm_cache else None)
+    sample_rate = processor.sample_audio_rate
+    metrics = AudioMetrics(None, sample_rate)
+    reference = processor.input_audio
+    reference_cache = {}
+    station = os.path.basename(os.path.dirname(mp3_path))
+
+    def filterKey(params):
+        if params['filter_type'] == 'iir':
+            return 'iir', params['low_freq'], params['high_freq'], params['order']
+        return 'fir', params['low_freq'], params['high_freq'], params['numtaps']
+
+    rows = []
+    for key, group in itertools.groupby(sorted(param_sets, key=filterKey), key=filterKey):
+        started = time.monotonic()
+        filtered = None
+        try:
+            if key[0] == 'iir':
+                filtered = processor.bandPassFilterIir(key[1], key[2], order=key[3])
+            else:
+                filtered = processor.bandPassFilterFir(key[1], key[2], numtaps=key[3])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        filter_seconds = time.monotonic() - started
+
+        for params in group:
+            started = time.monotonic()
+            row = {'file': mp3_path, 'station': station, **{k: params[k] for k in ['params'] + PARAM_KEYS}, 'error': None}
+            try:
+                if filtered is None:
+                    raise RuntimeError(error)
+                gated, _, _ = processor.vadGate(filtered, sample_rate, frame_ms=params['frame_ms'], mode=params['mode'],
+                                                hang_ms=params['hang_ms'], atten_db=params['atten_db'])
+                normalized, _ = processor.loudnessNormalizeAdaptive(gated, sample_rate, target_dbfs=params['target_dbfs'],
+                                                                    top_db=params['top_db'])
+                del gated
+                processed = processor.resample_to_16k(normalized, sample_rate)
+                with instrumentation.stage('compare', mp3_path, processed.nbytes):
+                    row.update(metrics.audio_compare(reference, processed, reference_cache))
+            except Exception as e:
+                row['error'] = f"{type(e).__name__}: {e}"
+            # The shared filter pass is charged to the first parameter set that used it.
+            row['seconds'] = round(time.monotonic() - started + filter_seconds, 3)
+            filter_seconds = 0.0
+            rows.append(row)
+    return rows
+
+
+class MetricAggregates:
+    """Running per-(station, params) and per-params count/mean/std of each metric, without keeping rows."""
+
+    def __init__(self):
+        self.groups = {}
+
+    def update(self, row):
+        for group in ((row['station'], row['params']), ('*', row['params'])):
+            stats = self.groups.setdefault(group, {'files': 0, 'errors': 0, **{key: [0, 0.0, 0.0] for key in METRIC_KEYS}})
+            stats['files'] += 1
+            stats['errors'] += row['error'] is not None
+            for key in METRIC_KEYS:
+                value = row.get(key)
+                if value is not None and np.isfinite(value):
+                    stats[key][0] += 1
+                    stats[key][1] += value
+                    stats[key][2] += value * value
+
+    def rows(self):
+        for (station, params), stats in sorted(self.groups.items()):
+            row = {'station': station, 'params': params, 'files': stats['files'], 'errors': stats['errors']}
+            for key in METRIC_KEYS:
+                count, total, squares = stats[key]
+                mean = total / count if count else None
+                row[f"{key}_mean"] = mean
+                row[f"{key}_std"] = float(np.sqrt(max(0.0, squares / count - mean * mean))) if count else None
+            yield row
+
+    def fields(self):
+        return ['station', 'params', 'files', 'errors'] + [f"{key}_{stat}" for key in METRIC_KEYS for stat in ('mean', 'std')]
+
+
+class RowWriter:
+    """Append rows to CSV, or to Parquet (needs pyarrow) when the path ends in `.parquet`, flushing as they come."""
+
+    def __init__(self, path, fields, batch_size=256):
+        self.path = path
+        self.fields = fields
+        self.batch_size = batch_size
+        self.parquet = path.endswith('.parquet')
+        self.pending = []
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._pa = pa
+            self._writer = None
+            self._pq = pq
+        else:
+            self._file = open(path, 'w', newline='')
+            self._csv = csv.DictWriter(self._file, fieldnames=fields, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, row):
+        if not self.parquet:
+            self._csv.writerow(row)
+            self._file.flush()
+            return
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            self._flushParquet()
+
+    def _flushParquet(self):
+        if not self.pending:
+            return
+        if self._writer is None:
+            # Explicit types: a metric that is None throughout the first batch would otherwise become a null column.
+            schema = self._pa.schema([(field, self._pa.string() if field in TEXT_FIELDS else
+                                       self._pa.int64() if field in INTEGER_FIELDS else self._pa.float64())
+                                      for field in self.fields])
+            self._writer = self._pq.ParquetWriter(self.path, schema)
+        self._writer.write_table(self._pa.Table.from_pylist(
+            [{field: row.get(field) for field in self.fields} for row in self.pending], schema=self._writer.schema))
+        self.pending = []
+
+    def close(self):
+        if self.parquet:
+            self._flushParquet()
+            if self._writer is not None:
+                self._writer.close()
+        else:
+            self._file.close()
+
+
+def errorRows(mp3_path, param_sets, error):
+    """One row per parameter set for an archive whose worker failed before returning any."""
+    station = os.path.basename(os.path.dirname(mp3_path))
+    return [{'file': mp3_path, 'station': station, **{k: params[k] for k in ['params'] + PARAM_KEYS},
+             'seconds': None, 'error': error} for params in param_sets]
+
+
+def defaultWorkers():
+    """One worker per CPU, but no more than fit in physical memory at `WORKER_MEMORY` bytes each."""
+    workers = os.cpu_count() or 1
+    try:
+        memory = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return workers
+    return max(1, min(workers, memory // WORKER_MEMORY))
+
+
+def summaryPathFor(output_path):
+    stem, extension = os.path.splitext(output_path)
+    return f"{stem}_summary{extension}"
+
+
+def runEvaluation(mp3_paths, param_sets, output_path, workers=None, use_pcm_cache=False, on_rows=None):
+    """Evaluate every (file, parameter set) pair on a process pool, one file per task.
+
+    Rows are written to `output_path` as files finish; per-station and per-parameter aggregates
+    (station `*` is the whole corpus) go to `<output>_summary` at the end and are returned. A file
+    whose worker fails (e.g. killed for running out of memory) gets error rows, and the summary is
+    written even if the run is interrupted. Each worker needs up to `WORKER_MEMORY` for a 30-minute
+    archive; `workers` defaults to `defaultWorkers()`.
+    """
+    workers = workers or defaultWorkers()
+    aggregates = MetricAggregates()
+    writer = RowWriter(output_path, ROW_FIELDS)
+
+    def record(rows):
+        for row in rows:
+            writer.write(row)
+            aggregates.update(row)
+        if on_rows:
+            on_rows(rows)
+
+    def collect(done):
+        for future in done:
+            mp3_path = pending.pop(future)
+            try:
+                rows = future.result()
+            except Exception as e:
+                rows = errorRows(mp3_path, param_sets, f"{type(e).__name__}: {e}")
+            record(rows)
+
+    pending = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for mp3_path in mp3_paths:
+                if len(pending) >= 2 * workers:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                try:
+                    pending[pool.submit(evaluateFile, mp3_path, param_sets, use_pcm_cache)] = mp3_path
+                except BrokenProcessPool as e:
+                    record(errorRows(mp3_path, param_sets, f"{type(e).__name__}: {e}"))
+            collect(wait(pending).done)
+    finally:
+        writer.close()
+        summary = list(aggregates.rows())
+        summary_writer = RowWriter(summaryPathFor(output_path), aggregates.fields())
+        for row in summary:
+            summary_writer.write(row)
+        summary_writer.close()
+    return summary
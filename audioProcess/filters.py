@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+from scipy import signal
+import numpy as np
+
+
+@lru_cache(maxsize=64)
+def designFirCached(sample_rate, low_freq, high_freq, numtaps=401, window=('kaiser', 8.0), equalize=True):
+    """Band-pass FIR coefficients with passband gain normalisation, memoised per (fs, band, taps, window).
+
+    The returned array is shared between callers and therefore read-only.
+    """
+    if high_freq >= sample_rate / 2:
+        high_freq = sample_rate / 2 - 1.0
+
+    fir_coeff = signal.firwin(numtaps, [low_freq, high_freq], window=window, pass_zero=False, fs=sample_rate)
+    w, h = signal.freqz(fir_coeff, worN=4096, fs=sample_rate)
+    pb = (w >= 500) & (w <= 2500)
+    g = np.mean(np.abs(h[pb])) + 1e-12
+    fir_coeff /= g
+
+    if equalize:
+        computedFrequencies, frequencyResponse = signal.freqz(fir_coeff, worN=4096, fs=sample_rate)
+        passband = (computedFrequencies >= low_freq*1.1) & (computedFrequencies <= high_freq*0.9)
+        gain = np.median(np.abs(frequencyResponse[passband])) if np.any(passband) else 1.0
+        if gain > 1e-12:
+            fir_coeff = fir_coeff / gain
+
+    fir_coeff.setflags(write=False)
+    return fir_coeff
+
+
+@lru_cache(maxsize=64)
+def designIirCached(sample_rate, low_freq, high_freq, order=6, equalize=True):
+    """Butterworth band-pass SOS and its median passband gain (1.0 when not equalising), memoised.
+
+    The SOS array is shared between callers; it stays writable only because `sosfilt` requires it.
+    """
+    if high_freq >= sample_rate / 2:
+        high_freq = sample_rate / 2 - 1.0
+
+    sos = signal.iirfilter(order, [low_freq, high_freq], btype='bandpass', ftype='butter', output='sos', fs=sample_rate)
+
+    gain = 1.0
+    if equalize:
+        computedFrequencies, frequencyResponse = signal.freqz_sos(sos, worN=4096, fs=sample_rate)
+        passband = (computedFrequencies >= low_freq*1.1) & (computedFrequencies <= high_freq*0.9)
+        gain = np.median(np.abs(frequencyResponse[passband])) if np.any(passband) else 1.0
+        if gain <= 1e-12:
+            gain = 1.0
+
+    return sos, gain
+
+
+def _fftLfilterSteady(fir_coeff, x):
+    # lfilter(b, 1, x, zi=lfilter_zi(b, 1) * x[0]) for an FIR is a convolution with the signal
+    # extended backwards by its first sample; overlap-add does that in O(n log m).
+    head = np.full(len(fir_coeff) - 1, x[0], dtype=x.dtype)
+    return signal.oaconvolve(np.concatenate((head, x)), fir_coeff, mode='valid')
+
+
+def fftFiltfilt(fir_coeff, x, dtype=np.float64):
+    """`signal.filtfilt(fir_coeff, [1.0], x)` computed with overlap-add FFT convolutions.
+
+    Uses the same odd-extension padding and initial conditions as `filtfilt`, so the result matches
+    it to float rounding over the whole signal, edges included. With `dtype=np.float32` the whole
+    computation stays in single precision.
+    """
+    x = np.asarray(x, dtype=dtype)
+    fir_coeff = np.asarray(fir_coeff, dtype=dtype)
+    padlen = 3 * len(fir_coeff)
+    if len(x) <= padlen:
+        return signal.filtfilt(fir_coeff, [1.0], x).astype(dtype, copy=False)
+
+    extended = np.concatenate((2 * x[0] - x[padlen:0:-1], x, 2 * x[-1] - x[-2:-(padlen + 2):-1]))
+    forward = _fftLfilterSteady(fir_coeff, extended)
+    del extended
+    backward = _fftLfilterSteady(fir_coeff, forward[::-1])[::-1]
+    del forward
+    return backward[padlen:-padlen]
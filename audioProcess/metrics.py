@@ -2,6 +2,78 @@ import numpy as np
 import librosa as lr
 import webrtcvad
 
+from audioProcess.vad import frameFlags
+
+
+# STFT frames computed per block: the complex STFT exists one block at a time.
+FRAME_BLOCK = 8192
+
+
+class SignalFeatures:
+    """Per-signal cache of what the metrics use: STFT magnitudes, log-mel spectrograms, MFCCs and VAD flags.
+
+    Computed once per parameter set, at the precision of the input. The complex STFT and the power
+    spectrogram are never held for the whole signal: a 30-minute signal's complex128 STFT alone is
+    ~0.9 GB, and the mel spectrogram's (n_fft=2048) ~1.8 GB. They are computed `FRAME_BLOCK` frames at
+    a time, which gives exactly the values of the whole-signal librosa call.
+    """
+
+    def __init__(self, audio, sample_rate):
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self._cache = {}
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def clear(self):
+        self._cache.clear()
+
+    def _framewise(self, n_fft, hop, compute):
+        """`compute(y)` over blocks of frames of `lr.stft(audio, center=True)`, concatenated along time.
+
+        Each block is the slice of the zero-padded signal that holds its frames, analysed with
+        center=False, so every frame sees the same samples as in the whole-signal transform.
+        """
+        padded = np.pad(self.audio, n_fft // 2)
+        num_frames = 1 + (len(padded) - n_fft) // hop
+        out = None
+        for start in range(0, num_frames, FRAME_BLOCK):
+            stop = min(start + FRAME_BLOCK, num_frames)
+            block = compute(padded[start * hop:(stop - 1) * hop + n_fft])
+            if out is None:
+                # Fortran order, like lr.stft's output, so that reductions over frequency sum in the
+                # same order as on the whole-signal transform.
+                out = np.empty(block.shape[:-1] + (num_frames,), dtype=block.dtype, order='F')
+            out[..., start:stop] = block
+        return out
+
+    def stft(self, n_fft=512, hop=128, win='hann'):
+        return lr.stft(self.audio, n_fft=n_fft, hop_length=hop, window=win)
+
+    def magnitude(self, n_fft=512, hop=128, win='hann'):
+        return self._memo(('magnitude', n_fft, hop, win), lambda: self._framewise(n_fft, hop, lambda y: np.abs(
+            lr.stft(y, n_fft=n_fft, hop_length=hop, window=win, center=False))))
+
+    def power(self, n_fft=512, hop=128, win='hann'):
+        """|STFT|², derived from the cached magnitude on each call."""
+        return np.square(self.magnitude(n_fft, hop, win))
+
+    def melDb(self, hop=256, n_fft=2048):
+        # What lr.feature.mfcc(y=...) computes internally before the DCT.
+        return self._memo(('melDb', hop), lambda: lr.power_to_db(self._framewise(n_fft, hop, lambda y: (
+            lr.feature.melspectrogram(y=y, sr=self.sample_rate, n_fft=n_fft, hop_length=hop, center=False)))))
+
+    def mfcc(self, nMfcc=13, hop=256):
+        return self._memo(('mfcc', nMfcc, hop), lambda: lr.feature.mfcc(S=self.melDb(hop), n_mfcc=nMfcc))
+
+    def vadFlags(self, frame_ms=30, mode=2):
+        frame_length = int(np.round(self.sample_rate * frame_ms / 1000))
+        return self._memo(('vad', frame_ms, mode), lambda: (
+            frameFlags(self.audio, self.sample_rate, frame_length, webrtcvad.Vad(mode)), frame_length))
+
 
 class AudioMetrics:
     def __init__(self, audio_data, sample_rate=16000):
@@ -13,52 +85,45 @@ class AudioMetrics:
         return 20*np.log10(np.sqrt(np.mean(inputAudio**2) + self.EPS))
 
 
+    def features(self, inputAudio):
+        """Wrap an array in a SignalFeatures cache; SignalFeatures are passed through."""
+        if isinstance(inputAudio, SignalFeatures):
+            return inputAudio
+        return SignalFeatures(inputAudio, self.sample_rate)
+
     def _stft_mag2(self, inputAudio, n_fft=512, hop=128, win='hann'):
-        stft = lr.stft(inputAudio, n_fft=n_fft, hop_length=hop, window=win)
-        mag2 = np.abs(stft)**2
-        return mag2, stft
+        return self.features(inputAudio).power(n_fft, hop, win)
     
     def _vad_flags(self, inputAudio, frame_ms=30, top_db=25):
 
-        frame_length = int(np.round(self.sample_rate * frame_ms / 1000))
-        num_frames = int(np.ceil(len(inputAudio) / frame_length))
-        flags = np.zeros(num_frames, dtype=bool)
-
-        vad = webrtcvad.Vad(2)
-        audio_int16 = (np.clip(inputAudio, -1.0, 1.0) * 32767).astype(np.int16)
-        for i in range(num_frames):
-            start = i * frame_length
-            stop = min((i + 1) * frame_length, len(audio_int16))
-            frame = np.zeros(frame_length, dtype=np.int16)
-            frame[:stop-start] = audio_int16[start:stop]
-            is_speech = vad.is_speech(frame.tobytes(), sample_rate=self.sample_rate)
-            flags[i] = is_speech
-        return flags, frame_length
+        return self.features(inputAudio).vadFlags(frame_ms, mode=2)
     
 
     def log_spectral_distance(self, audioReference, audioTarget, nFft=512, hop=128):
 
-        refStft = lr.stft(audioReference, n_fft=nFft, hop_length=hop)
-        targetStft = lr.stft(audioTarget, n_fft=nFft, hop_length=hop)
+        refMagnitude = self.features(audioReference).magnitude(nFft, hop)
+        targetMagnitude = self.features(audioTarget).magnitude(nFft, hop)
 
-        minLength = min(refStft.shape[1], targetStft.shape[1])
-        refStft = refStft[:, :minLength]
-        targetStft = targetStft[:, :minLength]
+        minLength = min(refMagnitude.shape[1], targetMagnitude.shape[1])
 
-        refStftMaximun = np.maximum(np.abs(refStft), self.EPS)
-        targetStftMaximun = np.maximum(np.abs(targetStft), self.EPS)
+        # Each frame's distance only depends on its own column, so the dB arrays are built a block at a time.
+        lsdT = np.empty(minLength)
+        for start in range(0, minLength, FRAME_BLOCK):
+            stop = min(start + FRAME_BLOCK, minLength)
+            refStftMaximun = np.maximum(refMagnitude[:, start:stop], self.EPS)
+            targetStftMaximun = np.maximum(targetMagnitude[:, start:stop], self.EPS)
 
-        diffDb = 20*np.log10(refStftMaximun) - 20*np.log10(targetStftMaximun)
+            diffDb = 20*np.log10(refStftMaximun) - 20*np.log10(targetStftMaximun)
 
-        lsdT = np.sqrt(np.mean(diffDb**2, axis=0))
+            lsdT[start:stop] = np.sqrt(np.mean(diffDb**2, axis=0))
 
         return float(np.mean(lsdT)), float(np.median(lsdT) )
 
 
     def mfcc_dist(self, audioReference, audioTarget, nMfcc=13, hop=256):
 
-        mfccRef = lr.feature.mfcc(y=audioReference, sr=self.sample_rate, n_mfcc=nMfcc, hop_length=hop)
-        mfccTarget = lr.feature.mfcc(y=audioTarget, sr=self.sample_rate, n_mfcc=nMfcc, hop_length=hop)
+        mfccRef = self.features(audioReference).mfcc(nMfcc, hop)
+        mfccTarget = self.features(audioTarget).mfcc(nMfcc, hop)
 
         minLength = min(mfccRef.shape[1], mfccTarget.shape[1])
         mfccRef = mfccRef[:, :minLength]
@@ -72,54 +137,77 @@ class AudioMetrics:
     def snr_estimate_from_nonspeech(self, audioNonspeech, audioSpeech, frameMs=30, nFFT=512, hop=128):
 
         flags, frameLength = self._vad_flags(audioNonspeech, frameMs)
-        mask = np.repeat(flags, frameLength)[:len(audioNonspeech)]
+        numSamples = len(self.features(audioNonspeech).audio)
 
-        pninput, _ = self._stft_mag2(audioNonspeech, n_fft=nFFT, hop=hop)
-        psoutput, _ = self._stft_mag2(audioSpeech,    n_fft=nFFT, hop=hop)
+        # Magnitudes, squared a block at a time below: |STFT|² of both signals would double their memory.
+        mninput = self.features(audioNonspeech).magnitude(nFFT, hop)
+        msoutput = self.features(audioSpeech).magnitude(nFFT, hop)
 
-        frameLength = min(pninput.shape[1], psoutput.shape[1], int(np.ceil(len(mask)/hop)))
+        frameLength = min(mninput.shape[1], msoutput.shape[1], int(np.ceil(numSamples/hop)))
         frameMsStft = 1000.0 * hop / self.sample_rate
-        speechFrames = []
-
-        for frame in range(frameLength):
-            idx = int(round((frame * frameMsStft) / frameMs))
-            idx = min(idx, len(flags) - 1)
-            if flags[idx]:
-                speechFrames.append(frame)
 
-        monoSpeechFrames = list(set(range(frameLength)) - set(speechFrames))
+        # STFT frame -> VAD frame, rounding half to even like the builtin round().
+        idx = np.minimum(np.rint((np.arange(frameLength) * frameMsStft) / frameMs).astype(int), len(flags) - 1)
+        isSpeech = flags[idx]
+        speechFrames = np.flatnonzero(isSpeech)
+        monoSpeechFrames = np.flatnonzero(~isSpeech)
 
         if len(monoSpeechFrames) == 0 or len(speechFrames) == 0:
             return None, None, None
 
-        noiseProfile = np.mean(pninput[:, monoSpeechFrames], axis=1, keepdims=True) + self.EPS
+        noiseFrames = mninput[:, monoSpeechFrames]
+        noiseProfile = np.mean(np.square(noiseFrames, out=noiseFrames), axis=1, keepdims=True) + self.EPS
+        del noiseFrames
         Npow = float(np.sum(noiseProfile))
 
-        snrInput = []
-        snrOutput = []
-        for frame in speechFrames:
-            psInput  = float(np.sum(pninput[:, frame]))
-            psOutput = float(np.sum(psoutput[:, frame]))
-            snrInput.append( 10 * np.log10((psInput  + self.EPS) / Npow) )
-            snrOutput.append(10 * np.log10((psOutput + self.EPS) / Npow) )
+        # Per frame, over a block of frames at a time. Row-contiguous copies so each frame sums in the
+        # same order as a single-column np.sum.
+        def framePower(magnitude):
+            return np.concatenate([
+                np.ascontiguousarray(np.square(magnitude[:, speechFrames[start:start + FRAME_BLOCK]]).T).sum(axis=1)
+                for start in range(0, len(speechFrames), FRAME_BLOCK)])
+
+        psInput = framePower(mninput)
+        psOutput = framePower(msoutput)
+        snrInput = 10 * np.log10((psInput + self.EPS) / Npow)
+        snrOutput = 10 * np.log10((psOutput + self.EPS) / Npow)
 
         snrInput  = float(np.mean(snrInput))
         snrOutput = float(np.mean(snrOutput))
         return snrInput, snrOutput, (snrOutput - snrInput)
 
 
-    def audio_compare(self, referenceAudio, processedAudio):
+    def audio_compare(self, referenceAudio, processedAudio, referenceCache=None):
+        """Compare a processed signal against its reference.
 
+        Pass the same `referenceCache` dict when comparing one reference with several processed
+        signals: the reference's VAD flags and spectral features are then computed only once. Only the
+        features of the latest comparison length and scale are kept, and the processed signal's are
+        dropped before returning.
+        """
         numFrames = min(len(referenceAudio), len(processedAudio))
-        referenceAudioOutput = np.asarray(referenceAudio[:numFrames], dtype=float)
-        processedAudioOutput = np.asarray(processedAudio[:numFrames], dtype=float)
+        referenceAudioOutput = np.array(referenceAudio[:numFrames], dtype=float)
+        processedAudioOutput = np.array(processedAudio[:numFrames], dtype=float)
 
         maxDiff = max(np.max(np.abs(referenceAudioOutput)), np.max(np.abs(processedAudioOutput)), 1.0)
 
         referenceAudioOutput /= maxDiff
         processedAudioOutput /= maxDiff
 
-        flags, frameLength = self._vad_flags(referenceAudio)
+        if referenceCache is None:
+            referenceCache = {}
+        if 'raw' not in referenceCache:
+            referenceCache['raw'] = self.features(referenceAudio)
+        rawReference = referenceCache['raw']
+        # The normalised reference depends on the comparison length and scale.
+        if referenceCache.get('normalizedKey') != (numFrames, maxDiff):
+            referenceCache['normalizedKey'] = (numFrames, maxDiff)
+            referenceCache['normalized'] = self.features(referenceAudioOutput)
+        reference = referenceCache['normalized']
+        referenceAudioOutput = reference.audio
+        processed = self.features(processedAudioOutput)
+
+        flags, frameLength = self._vad_flags(rawReference)
         mask = np.repeat(flags, frameLength)[:len(referenceAudioOutput)]
         nsInput = referenceAudioOutput[~mask] if np.any(~mask) else referenceAudioOutput[:0]
         nsOutput = processedAudioOutput[~mask] if np.any(~mask) else processedAudioOutput[:0]
@@ -133,10 +221,11 @@ class AudioMetrics:
         spRmsOutputDb = self.compute_rms(spOutput) if len(spOutput) > 0 else None
         speechLevelDeltaDb = (spRmsInputDb - spRmsOutputDb) if spRmsInputDb is not None and spRmsOutputDb is not None else None
 
-        snrInput, snrOutput, snrDelta = self.snr_estimate_from_nonspeech(referenceAudioOutput, processedAudioOutput)
+        snrInput, snrOutput, snrDelta = self.snr_estimate_from_nonspeech(reference, processed)
 
-        lsdMeanDb, lsdMedDb = self.log_spectral_distance(referenceAudioOutput, processedAudioOutput)
-        mfccMean, mfccMed = self.mfcc_dist(referenceAudioOutput, processedAudioOutput)
+        lsdMeanDb, lsdMedDb = self.log_spectral_distance(reference, processed)
+        mfccMean, mfccMed = self.mfcc_dist(reference, processed)
+        processed.clear()
 
         return {
             "nsRmsInputDb": nsRmsInputDb,
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from audioProcess.streaming import decodeAudio
+
+
+CACHE_DIR = os.path.join(os.environ.get('LIVEATC_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'liveatc')), 'pcm')
+
+
+def fileHash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PcmCache:
+    """Decoded float32 PCM stored once per (file content hash, sample rate) and reopened memory-mapped.
+
+    Entries are `.npy` files; a hit refreshes the entry's mtime, and `evict` drops entries older than
+    `max_age` seconds, then the least recently used ones until the cache fits in `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=10 * 1024**3, max_age=30 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entryPath(self, audio_file_path, sample_rate):
+        return os.path.join(self.cache_dir, f"{fileHash(audio_file_path)}-{sample_rate}.npy")
+
+    def load(self, audio_file_path, sample_rate=16000):
+        """Same result as `decodeAudio(audio_file_path, sample_rate)`, as a read-only memmap after the first call.
+
+        Workers may share the cache, so an entry can be evicted by another process at any point; it is
+        then decoded again, and returned in memory if it is evicted before it could be reopened.
+        """
+        entry_path = self.entryPath(audio_file_path, sample_rate)
+        try:
+            os.utime(entry_path)
+            return np.load(entry_path, mmap_mode='r'), sample_rate
+        except FileNotFoundError:
+            pass
+
+        audio = decodeAudio(audio_file_path, sample_rate)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(audio, dtype=np.float32))
+        os.replace(tmp_path, entry_path)
+        self.evict()
+        try:
+            return np.load(entry_path, mmap_mode='r'), sample_rate
+        except FileNotFoundError:
+            return audio, sample_rate
+
+    @staticmethod
+    def _remove(path):
+        # Another worker evicting at the same time may have removed it first.
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
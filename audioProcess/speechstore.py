@@ -0,0 +1,165 @@
+import bisect
+import json
+
+import numpy as np
+import soundfile as sf
+
+
+# codec: (soundfile format, subtype, extension). libsndfile's Opus takes 8/12/16/24/48 kHz.
+STORE_CODECS = {
+    'flac': ('FLAC', 'PCM_16', '.flac'),
+    'opus': ('OGG', 'OPUS', '.opus'),
+}
+INDEX_SUFFIX = '.segments.json'
+
+
+def indexPathFor(store_path):
+    return store_path + INDEX_SUFFIX
+
+
+def writeSpeechStore(store_path, audio, sample_rate, segments, codec='flac', index_path=None):
+    """Write only the speech `segments` (seconds) of `audio`, back to back, plus a JSON segment index.
+
+    `audio` is the full-length processed signal at `sample_rate`, as an array or an open
+    `sf.SoundFile` (read segment by segment). The gated silence between segments is dropped; each
+    index entry is `[start, end, offset]`, the segment's sample range on the original timeline and
+    where it begins in the compressed stream. Returns the index.
+    """
+    fmt, subtype, _ = STORE_CODECS[codec]
+    length = audio.frames if isinstance(audio, sf.SoundFile) else len(audio)
+    entries = []
+    offset = 0
+    with sf.SoundFile(store_path, 'w', samplerate=sample_rate, channels=1, format=fmt, subtype=subtype) as store:
+        for start_s, end_s in segments:
+            start = max(0, int(round(start_s * sample_rate)))
+            end = min(length, int(round(end_s * sample_rate)))
+            if end <= start:
+                continue
+            if isinstance(audio, sf.SoundFile):
+                audio.seek(start)
+                clip = audio.read(end - start, dtype='float32')
+            else:
+                clip = np.asarray(audio[start:end], dtype=np.float32)
+            store.write(np.clip(clip, -1.0, 1.0))
+            entries.append([start, end, offset])
+            offset += end - start
+
+    index = {'version': 1, 'codec': codec, 'sample_rate': sample_rate, 'length': length, 'segments': entries}
+    with open(index_path or indexPathFor(store_path), 'w') as f:
+        json.dump(index, f)
+    return index
+
+
+class SpeechStore:
+    """Reader for `writeSpeechStore` output: random access to transmissions by time, and the full timeline on demand.
+
+    Opened from either the audio file or its `.segments.json` index. Positions are samples on the
+    original full-length timeline; everything outside the stored segments reads as zeros.
+    """
+
+    def __init__(self, path):
+        self.index_path = path if path.endswith(INDEX_SUFFIX) else indexPathFor(path)
+        with open(self.index_path) as f:
+            index = json.load(f)
+        self.codec = index['codec']
+        self.sample_rate = index['sample_rate']
+        self.length = index['length']
+        self.segments = index['segments']
+        self.starts = [start for start, _, _ in self.segments]
+        self.store_path = self.index_path[:-len(INDEX_SUFFIX)]
+        self._file = None
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def duration(self):
+        return self.length / self.sample_rate
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, offset, frames):
+        if self._file is None:
+            self._file = sf.SoundFile(self.store_path)
+        self._file.seek(offset)
+        return self._file.read(frames, dtype='float32')
+
+    def segmentTimes(self):
+        """Speech segments as (start, end) in seconds."""
+        return [(start / self.sample_rate, end / self.sample_rate) for start, end, _ in self.segments]
+
+    def segmentAt(self, seconds):
+        """Index of the segment playing at `seconds`, or None during silence."""
+        position = int(round(seconds * self.sample_rate))
+        i = bisect.bisect_right(self.starts, position) - 1
+        if i >= 0 and position < self.segments[i][1]:
+            return i
+        return None
+
+    def segmentsBetween(self, start_s, end_s):
+        """Indices of the segments overlapping [start_s, end_s)."""
+        start, end = int(round(start_s * self.sample_rate)), int(round(end_s * self.sample_rate))
+        first = max(0, bisect.bisect_right(self.starts, start) - 1)
+        return [i for i in range(first, bisect.bisect_left(self.starts, end)) if self.segments[i][1] > start]
+
+    def readSegment(self, i):
+        start, end, offset = self.segments[i]
+        return self._read(offset, end - start)
+
+    def read(self, start, stop):
+        """Samples [start, stop) of the full-length timeline, decoding only the segments it overlaps."""
+        start, stop = max(0, start), min(self.length, stop)
+        output = np.zeros(max(0, stop - start), dtype=np.float32)
+        first = max(0, bisect.bisect_right(self.starts, start) - 1)
+        for i in range(first, bisect.bisect_left(self.starts, stop)):
+            seg_start, seg_end, offset = self.segments[i]
+            lo, hi = max(start, seg_start), min(stop, seg_end)
+            if hi > lo:
+                output[lo - start:hi - start] = self._read(offset + lo - seg_start, hi - lo)
+        return output
+
+    def timeline(self):
+        return LazyTimeline(self)
+
+    def blocks(self, block_seconds=10.0):
+        block_len = int(self.sample_rate * block_seconds)
+        for start in range(0, self.length, block_len):
+            yield self.read(start, start + block_len)
+
+
+class LazyTimeline:
+    """Array-like view of the full-length signal; slicing decodes only the speech it covers."""
+
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.length
+
+    @property
+    def shape(self):
+        return (self.store.length,)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.store.length)
+            return self.store.read(start, stop)[::step]
+        position = key + self.store.length if key < 0 else key
+        if not 0 <= position < self.store.length:
+            raise IndexError(key)
+        return self.store.read(position, position + 1)[0]
+
+    def __array__(self, dtype=None, copy=None):
+        audio = self.store.read(0, self.store.length)
+        return audio.astype(dtype) if dtype is not None else audio
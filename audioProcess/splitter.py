@@ -0,0 +1,165 @@
+import csv
+import glob
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+import instrumentation
+from audioProcess.audioProcessing import AudioProcessor
+
+
+INDEX_FIELDS = ['file', 'start', 'end', 'clip']
+CLIPS_SUFFIX = '.clips.json'
+
+
+def transmissionBounds(segments, sample_rate, length, padding_ms=250):
+    """Sample ranges of each transmission: VAD segments padded by `padding_ms`, clipped and merged where they overlap."""
+    pad = int(sample_rate * padding_ms / 1000)
+    bounds = []
+    for t0, t1 in segments:
+        start = max(0, int(round(t0 * sample_rate)) - pad)
+        end = min(length, int(round(t1 * sample_rate)) + pad)
+        if bounds and start <= bounds[-1][1]:
+            bounds[-1] = (bounds[-1][0], max(bounds[-1][1], end))
+        elif end > start:
+            bounds.append((start, end))
+    return bounds
+
+
+def normalizeDbfs(clip, target_dbfs):
+    rms = float(np.sqrt(np.mean(np.square(clip, dtype=np.float64))))
+    if rms < 1e-9:
+        return clip
+    return clip * (10.0 ** ((target_dbfs - 20.0 * np.log10(rms)) / 20.0))
+
+
+def exportClip(clip, sample_rate, clip_path, noise_reduce=True, prop_decrease=0.5, target_dbfs=-24.0, original_path=None):
+    """Normalise, optionally noise-reduce and write one transmission. Runs in a worker process."""
+    with instrumentation.stage('export', clip_path, clip.nbytes):
+        clip = normalizeDbfs(np.asarray(clip, dtype=np.float32), target_dbfs)
+        if original_path:
+            sf.write(original_path, clip, sample_rate)
+
+        if noise_reduce:
+            import noisereduce as nr
+            clip = normalizeDbfs(nr.reduce_noise(y=clip, sr=sample_rate, prop_decrease=prop_decrease), target_dbfs)
+
+        sf.write(clip_path, np.clip(clip, -1.0, 1.0), sample_rate)
+    return clip_path
+
+
+def splitFile(mp3_path, output_dir, pool, padding_ms=250, noise_reduce=True, keep_original=False,
+              low_freq=250, high_freq=3400, frame_ms=30, mode=3, hang_ms=150, pcm_cache=None):
+    """Cut one archive into per-transmission clips using vadGate's speech segments.
+
+    Clips are taken from the band-passed (not gated) signal and exported on `pool`. Returns index
+    rows of (file, start, end, clip), times in seconds.
+    """
+    processor = AudioProcessor(mp3_path, pcm_cache=pcm_cache)
+    sample_rate = processor.sample_audio_rate
+    filtered = processor.bandPassFilterFir(low_freq, high_freq)
+    _, segments, _ = processor.vadGate(filtered, sample_rate, frame_ms=frame_ms, mode=mode, hang_ms=hang_ms, atten_db=0)
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem, _ = os.path.splitext(os.path.basename(mp3_path))
+    rows, futures = [], []
+    for i, (start, end) in enumerate(transmissionBounds(segments, sample_rate, len(filtered), padding_ms)):
+        clip_path = os.path.join(output_dir, f"{stem}-{i:04d}.wav")
+        original_path = os.path.join(output_dir, f"{stem}-{i:04d}-orig.wav") if keep_original else None
+        futures.append(pool.submit(exportClip, filtered[start:end], sample_rate, clip_path, noise_reduce,
+                                   original_path=original_path))
+        rows.append({'file': mp3_path, 'start': round(start / sample_rate, 3), 'end': round(end / sample_rate, 3),
+                     'clip': clip_path})
+
+    for future in futures:
+        future.result()
+    return rows
+
+
+def clipsManifestPath(mp3_path, output_dir):
+    """Per-archive record of the options and index rows its clips were cut with."""
+    stem, _ = os.path.splitext(os.path.basename(mp3_path))
+    return os.path.join(output_dir, stem + CLIPS_SUFFIX)
+
+
+def readClipsManifest(mp3_path, output_dir):
+    try:
+        with open(clipsManifestPath(mp3_path, output_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clipsUpToDate(mp3_path, output_dir, options):
+    """The archive's clips are newer than it, were cut with `options` and are all still on disk."""
+    manifest_path = clipsManifestPath(mp3_path, output_dir)
+    manifest = readClipsManifest(mp3_path, output_dir)
+    return (manifest is not None and manifest['options'] == options
+            and os.path.getmtime(manifest_path) >= os.path.getmtime(mp3_path)
+            and all(os.path.exists(row['clip']) for row in manifest['rows']))
+
+
+def removeClips(mp3_path, output_dir):
+    """Delete the clips (and originals) of an earlier split of `mp3_path` and its clips manifest."""
+    stem, _ = os.path.splitext(os.path.basename(mp3_path))
+    pattern = os.path.join(glob.escape(output_dir), glob.escape(stem))
+    for path in glob.glob(pattern + '-[0-9][0-9][0-9][0-9].wav') + glob.glob(pattern + '-[0-9][0-9][0-9][0-9]-orig.wav'):
+        os.remove(path)
+    if os.path.exists(clipsManifestPath(mp3_path, output_dir)):
+        os.remove(clipsManifestPath(mp3_path, output_dir))
+
+
+def readIndex(index_path):
+    """Existing index rows grouped by source file, in file order."""
+    rows = {}
+    if os.path.exists(index_path):
+        with open(index_path, newline='') as index_file:
+            for row in csv.DictReader(index_file):
+                rows.setdefault(row['file'], []).append(row)
+    return rows
+
+
+def writeIndex(index_path, rows):
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', newline='') as index_file:
+        writer = csv.DictWriter(index_file, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        for file_rows in rows.values():
+            writer.writerows(file_rows)
+    os.replace(tmp_path, index_path)
+
+
+def splitArchives(mp3_paths, output_dir_for, index_path, workers=None, **kwargs):
+    """Split many archives, exporting clips in parallel, and keep the CSV index at `index_path` in step.
+
+    Archives whose clips are newer than them and were cut with the same options are skipped.
+    Otherwise their old clips are deleted before exporting, and their rows in the index (which is
+    rewritten after each archive) are replaced, so re-running never duplicates rows or leaves stale
+    clips behind. Returns (clips, skipped archives).
+    """
+    options = {name: kwargs.get(name, parameter.default)
+               for name, parameter in inspect.signature(splitFile).parameters.items()
+               if parameter.default is not inspect.Parameter.empty and name != 'pcm_cache'}
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    index = readIndex(index_path)
+    total = skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for mp3_path in mp3_paths:
+            output_dir = output_dir_for(mp3_path)
+            if clipsUpToDate(mp3_path, output_dir, options):
+                rows = readClipsManifest(mp3_path, output_dir)['rows']
+                skipped += 1
+            else:
+                removeClips(mp3_path, output_dir)
+                rows = splitFile(mp3_path, output_dir, pool, **kwargs)
+                with open(clipsManifestPath(mp3_path, output_dir), 'w') as f:
+                    json.dump({'options': options, 'rows': rows}, f)
+                instrumentation.log(f"✂️  {mp3_path}: {len(rows)} transmissões", file=mp3_path, clips=len(rows))
+            index[mp3_path] = rows
+            writeIndex(index_path, index)
+            total += len(rows)
+    return total, skipped
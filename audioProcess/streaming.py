@@ -0,0 +1,241 @@
+from scipy import signal
+import numpy as np
+import soundfile as sf
+import soxr
+import webrtcvad
+
+from audioProcess.vad import flagsToMask, frameFlags, speechRuns
+
+
+# libsndfile's MP3 decoder does not return the same samples for every read size on archives with
+# damaged frames (differences up to ~0.7 on real LiveATC files): reads are always this many frames, a
+# whole number of MPEG frames, and both the block and the whole-file decode go through them.
+DECODE_FRAMES = 1152 * 64
+
+
+def decodeBlocks(audio_file_path, sample_rate=16000, block_seconds=10.0):
+    """Decode an audio file block by block, mixed to mono and resampled to `sample_rate` (float32).
+
+    The file is read in fixed `DECODE_FRAMES` chunks whatever `block_seconds` is, so the
+    concatenated blocks are sample-identical to `decodeAudio` for any block size. No resampling when
+    the file is already at the target rate, otherwise a streaming soxr 'HQ' resampler (librosa's
+    default `soxr_hq`).
+    """
+    block_len = max(1, int(sample_rate * block_seconds))
+    pending, pending_len = [], 0
+    with sf.SoundFile(audio_file_path) as audio_file:
+        resampler = None
+        if audio_file.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(audio_file.samplerate, sample_rate, 1, dtype='float32', quality='HQ')
+
+        while True:
+            chunk = audio_file.read(DECODE_FRAMES, dtype='float32', always_2d=True)
+            last = len(chunk) < DECODE_FRAMES
+            chunk = chunk.mean(axis=1, dtype=np.float32) if chunk.shape[1] > 1 else chunk[:, 0]
+            if resampler is not None:
+                chunk = resampler.resample_chunk(chunk, last=last)
+            if len(chunk):
+                pending.append(chunk)
+                pending_len += len(chunk)
+            while pending_len >= block_len or (last and pending_len):
+                buffered = np.concatenate(pending) if len(pending) > 1 else pending[0]
+                yield buffered[:block_len]
+                pending = [buffered[block_len:]] if len(buffered) > block_len else []
+                pending_len = max(0, len(buffered) - block_len)
+            if last:
+                break
+
+
+def decodeAudio(audio_file_path, sample_rate=16000):
+    """Whole-file counterpart of `decodeBlocks` (same samples), in place of `lr.load(path, sr=sample_rate)`."""
+    blocks = list(decodeBlocks(audio_file_path, sample_rate, block_seconds=60.0))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+class IirStream:
+    """Causal SOS filter carrying `zi` across blocks; bit-exact with a single `signal.sosfilt` call."""
+
+    def __init__(self, sos, gain=1.0):
+        self.sos = sos
+        self.gain = gain
+        self.zi = np.zeros((sos.shape[0], 2))
+
+    def process(self, block):
+        filtered, self.zi = signal.sosfilt(self.sos, block, zi=self.zi)
+        return filtered / self.gain if self.gain != 1.0 else filtered
+
+    def flush(self):
+        return np.zeros(0)
+
+
+class FirZeroPhaseStream:
+    """Streaming equivalent of `signal.filtfilt(b, [1.0], x)` for a linear-phase FIR `b`.
+
+    Forward-backward filtering with `b` is a convolution with `b * b[::-1]`, applied here causally
+    with overlap-save FFT convolution and realigned by dropping its `len(b) - 1` samples of group
+    delay. Output differs from `filtfilt` only within the first/last `len(b)` samples, where
+    `filtfilt` uses odd-extension padding instead of zeros.
+    """
+
+    def __init__(self, fir_coeff):
+        self.taps = np.convolve(fir_coeff, fir_coeff[::-1])
+        self.delay = len(fir_coeff) - 1
+        self.history = np.zeros(len(self.taps) - 1)
+        self.to_skip = self.delay
+
+    def process(self, block):
+        extended = np.concatenate((self.history, block))
+        filtered = signal.oaconvolve(extended, self.taps, mode='valid')
+        self.history = extended[len(extended) - len(self.history):]
+        if self.to_skip:
+            skipped = min(self.to_skip, len(filtered))
+            filtered = filtered[skipped:]
+            self.to_skip -= skipped
+        return filtered
+
+    def flush(self):
+        return self.process(np.zeros(self.delay))
+
+
+class VadGateStream:
+    """Block-wise `AudioProcessor.vadGate` that carries partial frames and hangover state across blocks.
+
+    Output is delayed by `hang` frames (the hangover needs that much look-ahead) and is bit-exact
+    with the whole-file gate, as are the returned segments and frame flags.
+    """
+
+    def __init__(self, sample_rate, frame_ms, mode, hang_ms, atten_db):
+        assert frame_ms in (10, 20, 30) and sample_rate in (8000, 16000, 32000, 48000)
+
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.hang = max(0, int(round(hang_ms / frame_ms)))
+        self.att = 10 ** (-atten_db / 20.0)
+        self.vad = webrtcvad.Vad(mode)
+
+        self.remainder = np.zeros(0)
+        self.pending = np.zeros(0)
+        # Raw flags from frame `next_frame - hang` on; frames before 0 count as silence.
+        self.raw = np.zeros(self.hang, dtype=bool)
+        self.next_frame = 0
+        self.run_start = None
+        self.segments = []
+        self.flag_chunks = []
+
+    def _release(self):
+        ready = len(self.raw) - 2 * self.hang
+        if ready <= 0:
+            return np.zeros(0, dtype=self.pending.dtype)
+
+        kernel = np.ones(2 * self.hang + 1, dtype=int)
+        flags = np.convolve(self.raw.astype(int), kernel, mode='valid')[:ready] > 0
+        self.raw = self.raw[ready:]
+
+        audio = self.pending[:ready * self.frame_len]
+        self.pending = self.pending[ready * self.frame_len:]
+        mask = flagsToMask(flags, self.frame_len, len(audio))
+        gated = audio.copy()
+        gated[~mask] *= self.att
+
+        self._track_segments(flags)
+        self.flag_chunks.append(flags)
+        self.next_frame += ready
+        return gated
+
+    def _track_segments(self, flags):
+        starts, ends = speechRuns(flags)
+        starts, ends = (starts + self.next_frame).tolist(), (ends + self.next_frame).tolist()
+        if self.run_start is not None and starts and starts[0] == self.next_frame:
+            # Run continues from the previous block.
+            starts[0] = self.run_start
+        elif self.run_start is not None:
+            self.segments.append((self.run_start * self.frame_ms / 1000.0, self.next_frame * self.frame_ms / 1000.0))
+        self.run_start = None
+
+        if ends and ends[-1] == self.next_frame + len(flags):
+            # Last run is still open at the block edge.
+            self.run_start = starts.pop()
+            ends.pop()
+        self.segments.extend((s * self.frame_ms / 1000.0, e * self.frame_ms / 1000.0) for s, e in zip(starts, ends))
+
+    def process(self, block):
+        buffer = np.concatenate((self.remainder, block)) if len(self.remainder) else block
+        complete = (len(buffer) // self.frame_len) * self.frame_len
+        self.remainder = buffer[complete:]
+        if complete:
+            frames = buffer[:complete]
+            self.raw = np.concatenate((self.raw, frameFlags(frames, self.sample_rate, self.frame_len, self.vad)))
+            self.pending = np.concatenate((self.pending, frames)) if len(self.pending) else frames
+        return self._release()
+
+    def flush(self):
+        pad = (self.frame_len - len(self.remainder) % self.frame_len) % self.frame_len
+        tail = self.process(np.zeros(pad, dtype=self.remainder.dtype)) if pad else np.zeros(0)
+        self.raw = np.concatenate((self.raw, np.zeros(self.hang, dtype=bool)))
+        tail = np.concatenate((tail, self._release()))
+        if self.run_start is not None:
+            self.segments.append((self.run_start * self.frame_ms / 1000.0, self.next_frame * self.frame_ms / 1000.0))
+            self.run_start = None
+        return tail[:len(tail) - pad] if pad else tail
+
+    def frameFlags(self):
+        return np.concatenate(self.flag_chunks) if self.flag_chunks else np.zeros(0, dtype=bool)
+
+
+class ActiveRmsAccumulator:
+    """Running statistics that reproduce `loudnessNormalizeAdaptive`'s gain without keeping the signal.
+
+    `lr.effects.split(y, top_db)` marks centred 2048-sample frames (hop 512) as non-silent; the
+    intervals it returns are whole hops, so summing per-hop energies of the non-silent frames gives
+    the same active-speech RMS. Memory is one float64 per 512 samples (about 21 MB for a day at 16 kHz).
+    """
+
+    frame_length = 2048
+    hop_length = 512
+
+    def __init__(self):
+        self.hop_energy = []
+        self.partial_energy = 0.0
+        self.partial_count = 0
+        self.peak = 0.0
+
+    def update(self, block):
+        if not len(block):
+            return
+        self.peak = max(self.peak, float(np.max(np.abs(block))))
+        squares = np.square(block, dtype=np.float64)
+
+        head = min(len(squares), self.hop_length - self.partial_count)
+        self.partial_energy += float(np.sum(squares[:head]))
+        self.partial_count += head
+        squares = squares[head:]
+        if self.partial_count == self.hop_length:
+            self.hop_energy.append(np.array([self.partial_energy]))
+            self.partial_energy, self.partial_count = 0.0, 0
+
+        whole = (len(squares) // self.hop_length) * self.hop_length
+        if whole:
+            self.hop_energy.append(squares[:whole].reshape(-1, self.hop_length).sum(axis=1))
+        if whole < len(squares):
+            self.partial_energy = float(np.sum(squares[whole:]))
+            self.partial_count = len(squares) - whole
+
+    def activeRms(self, top_db):
+        energy = np.concatenate(self.hop_energy + [np.array([self.partial_energy])])
+        count = np.full(len(energy), self.hop_length)
+        count[-1] = self.partial_count
+        total = count.sum()
+        if total == 0:
+            return 1e-12
+
+        # Frame t spans hops t-2 .. t+1 (centred, zero-padded), mean over frame_length samples.
+        span = self.frame_length // self.hop_length
+        padded = np.concatenate((np.zeros(span // 2), energy, np.zeros(span // 2 - 1)))
+        mse = np.convolve(padded, np.ones(span), mode='valid') / self.frame_length
+        db = 10.0 * np.log10(np.maximum(1e-10, mse)) - 10.0 * np.log10(max(1e-10, mse.max()))
+        active = db > -top_db
+
+        if not active.any():
+            return float(np.sqrt(energy.sum() / total) + 1e-12)
+        return float(np.sqrt(energy[active].sum() / count[active].sum()) + 1e-12)
@@ -0,0 +1,153 @@
+import bisect
+import json
+import os
+import tempfile
+
+import numpy as np
+import soundfile as sf
+
+from audioProcess.filters import designFirCached, designIirCached
+from audioProcess.streaming import ActiveRmsAccumulator, FirZeroPhaseStream, IirStream, VadGateStream, decodeBlocks
+
+
+SLOT_SECONDS = 30 * 60
+NPY_HEADER_SIZE = 128
+
+
+def npyHeader(length):
+    """Version 1.0 `.npy` header for a float32 vector, padded to NPY_HEADER_SIZE bytes."""
+    header = f"{{'descr': '<f4', 'fortran_order': False, 'shape': ({length},), }}"
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+
+def timelineBlocks(sources, sample_rate=16000, block_seconds=10.0, spans=None, slot_seconds=SLOT_SECONDS):
+    """Decode `(label, path)` sources back to back as one stream of blocks, one slot each.
+
+    Every source occupies exactly `slot_seconds`, so source k starts at k * `slot_seconds` and the
+    timeline maps to wall-clock time from the first slot's start. An archive is trimmed to its slot
+    (LiveATC archives run a minute or two past the next slot's start) or padded with silence when it
+    is shorter; a source without a path (a slot that was never published) is all silence. The sample
+    range each source occupies and its decoded length in seconds are appended to `spans`.
+    """
+    block_len = int(sample_rate * block_seconds)
+    slot_len = int(sample_rate * slot_seconds)
+    position = 0
+    for label, path in sources:
+        start = position
+        decoded = 0
+        if path is not None:
+            blocks = decodeBlocks(path, sample_rate, block_seconds)
+            for block in blocks:
+                decoded += len(block)
+                block = block[:start + slot_len - position]
+                if len(block):
+                    position += len(block)
+                    yield block
+            blocks.close()
+        for offset in range(position - start, slot_len, block_len):
+            block = np.zeros(min(block_len, slot_len - offset), dtype=np.float32)
+            position += len(block)
+            yield block
+        if spans is not None:
+            spans.append({'slot': label, 'file': path, 'start': start, 'end': position,
+                          'decoded_seconds': decoded / sample_rate if path is not None else None})
+
+
+def indexPathFor(output_path, output_format):
+    if output_format == 'shards':
+        return os.path.join(output_path, 'timeline.json')
+    return os.path.splitext(output_path)[0] + '.json'
+
+
+def assembleTimeline(sources, output_path, output_format='memmap', low_freq=250, high_freq=3400, filter_type='fir',
+                     numtaps=401, order=6, frame_ms=30, mode=3, hang_ms=150, atten_db=80, target_dbfs=-20.0,
+                     top_db=25.0, sample_rate=16000, block_seconds=10.0, slot_seconds=SLOT_SECONDS):
+    """Filter -> vadGate -> loudness-normalise consecutive slots as one continuous signal.
+
+    Filter and VAD state carry across file boundaries, so transmissions straddling two slots are
+    neither clipped nor split, and one loudness gain applies to the whole timeline. Only a few
+    blocks are in memory: the gated signal is spooled to disk while the loudness statistics
+    accumulate, then scaled into either a float32 `.npy` at `output_path` (open it with
+    `np.load(path, mmap_mode='r')`) or, for `output_format='shards'`, one WAV per source in the
+    `output_path` directory. Each source fills exactly one `slot_seconds` slot (see `timelineBlocks`),
+    so timeline time is wall-clock time since the first slot. A JSON index next to the output lists
+    each source's span and the speech segments on the global timeline, in seconds from its start.
+    """
+    if filter_type == 'iir':
+        band_filter = IirStream(*designIirCached(sample_rate, low_freq, high_freq, order, True))
+    else:
+        band_filter = FirZeroPhaseStream(designFirCached(sample_rate, low_freq, high_freq, numtaps, ('kaiser', 8.0), True))
+    gate = VadGateStream(sample_rate, frame_ms, mode, hang_ms, atten_db)
+    stats = ActiveRmsAccumulator()
+    spans = []
+
+    if output_format == 'shards':
+        os.makedirs(output_path, exist_ok=True)
+        spool_fd, spool_path = tempfile.mkstemp(suffix='.f32', dir=output_path)
+        spool_offset = 0
+    else:
+        # The .npy is written in place: header space is reserved now and filled in once the length is known.
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        spool_fd, spool_path = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644), output_path
+        spool_offset = NPY_HEADER_SIZE
+
+    try:
+        with os.fdopen(spool_fd, 'wb') as spool:
+            spool.write(b'\0' * spool_offset)
+
+            def spoolBlock(gated):
+                stats.update(gated)
+                np.asarray(gated, dtype=np.float32).tofile(spool)
+
+            for block in timelineBlocks(sources, sample_rate, block_seconds, spans, slot_seconds):
+                spoolBlock(gate.process(band_filter.process(block)))
+            spoolBlock(gate.process(band_filter.flush()))
+            spoolBlock(gate.flush())
+
+            length = (spool.tell() - spool_offset) // 4
+            if output_format != 'shards':
+                spool.seek(0)
+                spool.write(npyHeader(length))
+
+        current_rms = stats.activeRms(top_db)
+        gain = 1.0 if current_rms < 1e-9 else 10.0 ** (target_dbfs / 20.0) / current_rms
+        scale = gain
+        if stats.peak * gain + 1e-12 > 0.999:
+            scale = gain * (0.999 / (stats.peak * gain + 1e-12))
+
+        block_len = int(sample_rate * block_seconds)
+        if output_format == 'shards' and length:
+            gated_audio = np.memmap(spool_path, dtype=np.float32, mode='r')
+            for span in spans:
+                if span['file'] is None:
+                    continue
+                stem, _ = os.path.splitext(os.path.basename(span['file']))
+                span['shard'] = os.path.join(output_path, f"{stem}_timeline.wav")
+                with sf.SoundFile(span['shard'], 'w', samplerate=sample_rate, channels=1) as shard:
+                    for start in range(span['start'], span['end'], block_len):
+                        shard.write(gated_audio[start:min(start + block_len, span['end'])] * scale)
+            del gated_audio
+        elif length:
+            output = np.load(output_path, mmap_mode='r+')
+            for start in range(0, length, block_len):
+                output[start:start + block_len] *= np.float32(scale)
+            output.flush()
+            del output
+    finally:
+        if output_format == 'shards':
+            os.remove(spool_path)
+
+    span_starts = [span['start'] / sample_rate for span in spans]
+    index = {
+        'sample_rate': sample_rate,
+        'format': output_format,
+        'output': output_path,
+        'gain': scale,
+        'sources': [dict(span, start=span['start'] / sample_rate, end=span['end'] / sample_rate) for span in spans],
+        'segments': [{'start': start, 'end': end, 'slot': spans[max(0, bisect.bisect_right(span_starts, start) - 1)]['slot']}
+                     for start, end in gate.segments],
+    }
+    with open(indexPathFor(output_path, output_format), 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
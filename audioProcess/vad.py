@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def toInt16(input_audio):
+    return (np.clip(input_audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def frameFlags(input_audio, sample_rate, frame_len, vad):
+    """Decision of `vad` (a `webrtcvad.Vad`) for every `frame_len` frame; a trailing partial frame is zero-padded.
+
+    The signal is converted to int16 once into a single contiguous buffer and each frame is handed
+    to webrtcvad as a zero-copy memoryview slice of it. The detector adapts as it goes, so pass the
+    same instance when feeding consecutive blocks of one signal.
+    """
+    num_frames = -(-len(input_audio) // frame_len)
+    pcm = np.zeros(num_frames * frame_len, dtype=np.int16)
+    pcm[:len(input_audio)] = toInt16(input_audio)
+
+    frame_bytes = 2 * frame_len
+    view = memoryview(pcm).cast('B')
+    is_speech = vad.is_speech
+    return np.fromiter((is_speech(view[i:i + frame_bytes], sample_rate) for i in range(0, len(view), frame_bytes)),
+                       dtype=bool, count=num_frames)
+
+
+def hangover(frame_flags, hang):
+    """Extend every speech frame by `hang` frames on both sides."""
+    if hang <= 0:
+        return frame_flags
+    kernel = np.ones(2*hang + 1, dtype=int)
+    return np.convolve(frame_flags.astype(int), kernel, mode='same') > 0
+
+
+def speechRuns(frame_flags):
+    """(start, end) frame indices of each run of speech frames, by run-length encoding."""
+    edges = np.diff(np.concatenate(([0], frame_flags.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def flagsToSegments(frame_flags, frame_ms):
+    starts, ends = speechRuns(frame_flags)
+    return [(s * frame_ms / 1000.0, e * frame_ms / 1000.0) for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+def attenuateSilence(audio, frame_flags, frame_len, att):
+    """In-place gating: scale every non-speech frame of `audio` by `att` without building a sample mask."""
+    starts, ends = speechRuns(~frame_flags)
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        audio[s * frame_len:e * frame_len] *= att
+    return audio
+
+
+def speechEnergy(audio, frame_flags, frame_len, block=1 << 16):
+    """(sum of squares, sample count) over speech frames, accumulated in float64 block by block."""
+    energy, count = 0.0, 0
+    starts, ends = speechRuns(frame_flags)
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        for b in range(s * frame_len, min(e * frame_len, len(audio)), block):
+            chunk = audio[b:min(b + block, e * frame_len)].astype(np.float64)
+            energy += float(np.dot(chunk, chunk))
+            count += len(chunk)
+    return energy, count
+
+
+def flagsToMask(frame_flags, frame_len, length):
+    return np.repeat(frame_flags, frame_len)[:length]
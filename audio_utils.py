@@ -51,4 +51,5 @@ def chunk_audio(audio, min_silence_len=200, keep_silence=500, silence_thresh=-48
     #     format = 'mp3'
     # )
 
-chunk_audio(load_audio('/tmp/KPDX3-Twr-123775-Oct-01-2021-2000Z.mp3'))
+if __name__ == '__main__':
+  chunk_audio(load_audio('/tmp/KPDX3-Twr-123775-Oct-01-2021-2000Z.mp3'))
@@ -0,0 +1,197 @@
+"""Local stand-in for archive.liveatc.net.
+
+Serves `/<station>/<prefix>-<date>-<time>.mp3` with deterministic content, configurable latency and
+a deterministic fraction of missing (404) slots. Supports HEAD, Range requests and keep-alive, so
+it exercises the same code paths as the real archive:
+
+    with ArchiveServer(latency=0.05, missing_rate=0.1) as server:
+        download_many(jobs, base_url=server.url)
+
+With `search={icao: stations}` it also stands in for the station search page at `<url>/search/`,
+with an ETag and Last-Modified and 304 answers to conditional requests.
+"""
+import hashlib
+import http.server
+import re
+import threading
+import time
+
+
+ARCHIVE_PATH = re.compile(r'^/(?P<station>[A-Za-z0-9_]+)/(?P<filename>[^/]+\.mp3)$')
+SEARCH_PATH = re.compile(r'^/search/\?icao=(?P<icao>[A-Za-z0-9]+)$')
+LAST_MODIFIED = 'Thu, 10 Jul 2025 00:00:00 GMT'
+
+
+def searchPage(stations):
+    """A search result page in the markup `liveatc.parse_stations` reads, for `get_stations` output."""
+    parts = ['<html><body>']
+    for station in stations:
+        parts.append(
+            f'<table class="body" border="0" padding="5"><tr><td><strong>{station["title"]}</strong>'
+            f'<font>{"UP" if station["up"] else "DOWN"}</font>'
+            f'<a href="/archive.php?m={station["identifier"]}">Archive</a></td></tr></table>')
+        rows = ''.join(f'<tr><td>{f["title"]}</td><td>{f["frequency"]}</td></tr>' for f in station['frequencies'])
+        parts.append(f'<table class="freqTable" colspan="2"><tr><th>Facility</th><th>Frequency</th></tr>{rows}</table>')
+    parts.append('</body></html>')
+    return ''.join(parts).encode()
+
+
+class ArchiveServer:
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, missing_rate=0.0, size=512 * 1024,
+                 bandwidth=None, available=None, ranges=True, search=None):
+        """`available(station, filename)` can override which slots exist (e.g. for a simulated clock).
+
+        With `ranges=False` the Range header is ignored, like a server without resume support.
+        `search` maps ICAO codes to the stations their search page lists; it can be changed while serving.
+        """
+        self.latency = latency
+        self.missing_rate = missing_rate
+        self.size = size
+        self.bandwidth = bandwidth
+        self.available = available
+        self.ranges = ranges
+        self.search = search if search is not None else {}
+        self.requests = {'GET': 0, 'HEAD': 0}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+        handler = type('Handler', (_Handler,), {'archive': self})
+        self.httpd = http.server.ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def exists(self, station, filename):
+        if self.available is not None:
+            return self.available(station, filename)
+        digest = hashlib.sha256(f"{station}/{filename}".encode()).digest()
+        return int.from_bytes(digest[:4], 'big') / 2**32 >= self.missing_rate
+
+    def content(self, station, filename):
+        seed = hashlib.sha256(f"{station}/{filename}".encode()).digest()
+        return (seed * (self.size // len(seed) + 1))[:self.size]
+
+    def count(self, method):
+        with self._lock:
+            self.requests[method] += 1
+
+    def answered(self, status):
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    archive = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        archive = self.archive
+        archive.count('GET' if send_body else 'HEAD')
+        if archive.latency:
+            time.sleep(archive.latency)
+
+        search = SEARCH_PATH.match(self.path)
+        if search:
+            self._respondSearch(search['icao'].upper(), send_body)
+            return
+
+        match = ARCHIVE_PATH.match(self.path)
+        if not match or not archive.exists(match['station'], match['filename']):
+            archive.answered(404)
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = archive.content(match['station'], match['filename'])
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        start, status = 0, 200
+        range_header = self.headers.get('Range')
+        if archive.ranges and range_header and range_header.startswith('bytes='):
+            start_str, _, end_str = range_header[len('bytes='):].partition('-')
+            start = int(start_str or 0)
+            end = int(end_str) + 1 if end_str else len(body)
+            if start >= len(body):
+                archive.answered(416)
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+            body_range = body[start:min(end, len(body))]
+        else:
+            body_range = body
+
+        archive.answered(status)
+        self.send_response(status)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', str(len(body_range)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{start + len(body_range) - 1}/{len(body)}")
+        self.end_headers()
+
+        if not send_body:
+            return
+        if archive.bandwidth:
+            step = max(1, int(archive.bandwidth / 20))
+            for offset in range(0, len(body_range), step):
+                self.wfile.write(body_range[offset:offset + step])
+                time.sleep(step / archive.bandwidth)
+        else:
+            self.wfile.write(body_range)
+
+    def _respondSearch(self, icao, send_body):
+        archive = self.archive
+        if icao not in archive.search:
+            archive.answered(404)
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = searchPage(archive.search[icao])
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            archive.answered(304)
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        archive.answered(200)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
@@ -0,0 +1,59 @@
+"""Peak memory and time of the float64 whole-file chain vs AudioProcessor.processFloat32.
+
+    python -m benchmarks.bench_float32 --minutes 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from audioProcess.audioProcessing import AudioProcessor
+from benchmarks.signals import writeAtcLikeFile
+
+
+def float64Chain(processor):
+    sample_rate = processor.sample_audio_rate
+    filtered = processor.bandPassFilterFir(250, 3400)
+    gated, _, _ = processor.vadGate(filtered, sample_rate, frame_ms=30, mode=3, hang_ms=150, atten_db=80)
+    normalized, _ = processor.loudnessNormalizeAdaptive(gated, sample_rate, target_dbfs=-20.0, top_db=25.0)
+    return processor.resample_to_16k(normalized, sample_rate)
+
+
+def float32Chain(processor):
+    return processor.processFloat32(250, 3400)[0]
+
+
+def measure(chain, processor):
+    tracemalloc.start()
+    started = time.perf_counter()
+    chain(processor)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': elapsed, 'peak_mb': peak / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = writeAtcLikeFile(os.path.join(tmp, 'atc.wav'), args.minutes * 60, args.sample_rate)
+        processor = AudioProcessor(path, sample_rate=args.sample_rate)
+        # Warm up caches (filter design, librosa/numba) outside the measurement.
+        float32Chain(processor)
+        float64Chain(processor)
+        input_mb = processor.input_audio.nbytes / 1e6
+        results = {'minutes': args.minutes, 'input_mb': input_mb,
+                   'float64': measure(float64Chain, processor), 'float32': measure(float32Chain, processor)}
+
+    results['peak_ratio'] = results['float32']['peak_mb'] / results['float64']['peak_mb']
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
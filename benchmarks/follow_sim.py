@@ -0,0 +1,80 @@
+"""Replay follow mode over simulated hours against the local archive server.
+
+Each slot is published a deterministic, random number of minutes after it ends (some never are);
+the follower runs on a SimulatedClock that the server also reads, so a day of polling takes seconds.
+Prints request volume and the latency from end of slot to download as JSON:
+
+    python -m benchmarks.follow_sim --hours 24 --feeds 3 --delay 2 --backoff 1
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks.archive_server import ArchiveServer
+from follower import SLOT, Follower, SimulatedClock
+from manifest import ARCHIVE_NAME, Manifest
+
+
+def publicationLag(station, filename, max_lag_minutes, never_rate):
+    """Minutes after the end of the slot at which it appears, or None if it never does."""
+    digest = hashlib.sha256(f"{station}/{filename}".encode()).digest()
+    if int.from_bytes(digest[:4], 'big') / 2**32 < never_rate:
+        return None
+    return int.from_bytes(digest[4:8], 'big') / 2**32 * max_lag_minutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated follow mode against a local archive server')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--feeds', type=int, default=2)
+    parser.add_argument('--delay', type=float, default=2, help='minutes')
+    parser.add_argument('--backoff', type=float, default=1, help='minutes')
+    parser.add_argument('--max-backoff', type=float, default=15, help='minutes')
+    parser.add_argument('--give-up', type=float, default=6, help='hours')
+    parser.add_argument('--max-lag', type=float, default=45, help='latest publication, minutes after the slot')
+    parser.add_argument('--never-rate', type=float, default=0.05, help='fraction of slots never published')
+    args = parser.parse_args()
+
+    start = datetime(2025, 7, 10)
+    clock = SimulatedClock(start)
+
+    def available(station, filename):
+        match = ARCHIVE_NAME.match(filename)
+        slot = datetime.strptime(f"{match['date']} {match['slot']}", '%b-%d-%Y %H%MZ')
+        lag = publicationLag(station, filename, args.max_lag, args.never_rate)
+        return lag is not None and clock.now() >= slot + SLOT + timedelta(minutes=lag)
+
+    feeds = [(f"sim_{n}", f"SIM-{n}", 'sim') for n in range(args.feeds)]
+    cwd = os.getcwd()
+    with ArchiveServer(size=16 * 1024, available=available) as server, tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with Manifest() as manifest, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                follower = Follower(feeds, manifest, clock=clock, delay=args.delay * 60, backoff=args.backoff * 60,
+                                    max_backoff=args.max_backoff * 60, give_up=args.give_up * 3600, base_url=server.url)
+                stats = follower.run(since=start, until=start + timedelta(hours=args.hours))
+        finally:
+            os.chdir(cwd)
+        requests = server.requests['GET'] + server.requests['HEAD']
+
+    latency = stats['download_latency']
+    slots = int(args.hours * 2) * args.feeds
+    print(json.dumps({
+        'slots': slots,
+        'downloaded': stats['downloaded'],
+        'gave_up': stats['gave_up'],
+        'requests': requests,
+        'requests_per_slot': requests / slots if slots else 0.0,
+        'requests_counted': stats['requests'],
+        'latency_median_min': statistics.median(latency) / 60 if latency else None,
+        'latency_p95_min': sorted(latency)[int(0.95 * (len(latency) - 1))] / 60 if latency else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
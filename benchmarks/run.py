@@ -0,0 +1,212 @@
+"""Reproducible benchmarks for the DSP and download hot paths.
+
+Every case runs in a fresh interpreter so peak RSS is per case. Results are printed (or written
+with --output) as JSON to compare across commits:
+
+    python -m benchmarks.run --rates 8000,16000,48000 --minutes 1,5,30,60 --output bench.json
+    python -m benchmarks.run --suite download --workers 1,4,8 --latency 0.05 --missing-rate 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+DSP_STAGES = ['decode', 'fir', 'fir_filtfilt', 'iir', 'vad', 'chain', 'float32', 'streaming', 'compare']
+
+
+def rssMb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def peakRssMb():
+    # ru_maxrss survives exec on Linux, so the parent must stay small (see runSignals).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def runDspStage(spec):
+    from audioProcess.audioProcessing import AudioProcessor
+    from audioProcess.metrics import AudioMetrics
+
+    path, stage, sample_rate = spec['path'], spec['stage'], spec['sample_rate']
+    streaming = stage == 'streaming'
+    started = time.perf_counter()
+    processor = AudioProcessor(path, streaming=streaming, sample_rate=sample_rate)
+    decode_seconds = time.perf_counter() - started
+
+    prepared = None
+    if stage == 'vad':
+        prepared = processor.bandPassFilterFir(250, 3400)
+    elif stage == 'compare':
+        prepared = processor.processFloat32(250, 3400, sample_rate_output=sample_rate)[0]
+
+    rss_before = rssMb()
+    started = time.perf_counter()
+    if stage == 'decode':
+        elapsed = decode_seconds
+    else:
+        if stage == 'fir':
+            processor.bandPassFilterFir(250, 3400)
+        elif stage == 'fir_filtfilt':
+            processor.bandPassFilterFir(250, 3400, method='filtfilt')
+        elif stage == 'iir':
+            processor.bandPassFilterIir(250, 3400)
+        elif stage == 'vad':
+            processor.vadGate(prepared, sample_rate, frame_ms=30, mode=3, hang_ms=150, atten_db=80)
+        elif stage == 'chain':
+            filtered = processor.bandPassFilterFir(250, 3400)
+            gated, _, _ = processor.vadGate(filtered, sample_rate, frame_ms=30, mode=3, hang_ms=150, atten_db=80)
+            normalized, _ = processor.loudnessNormalizeAdaptive(gated, sample_rate)
+            processor.resample_to_16k(normalized, sample_rate)
+        elif stage == 'float32':
+            processor.processFloat32(250, 3400)
+        elif stage == 'streaming':
+            with tempfile.TemporaryDirectory() as tmp:
+                processor.processStreaming(os.path.join(tmp, 'out.wav'), 250, 3400)
+        elif stage == 'compare':
+            AudioMetrics(None, sample_rate).audio_compare(processor.input_audio, prepared)
+        else:
+            raise ValueError(f"unknown stage {stage}")
+        elapsed = time.perf_counter() - started
+
+    audio_seconds = spec['minutes'] * 60
+    return {'seconds': elapsed, 'rtf': elapsed / audio_seconds, 'x_realtime': audio_seconds / elapsed,
+            'rss_before_mb': rss_before, 'peak_rss_mb': peakRssMb()}
+
+
+def runDownload(spec):
+    from benchmarks.archive_server import ArchiveServer
+    from downloader import download_many
+
+    jobs = [('bench_twr', 'Jul-10-2025', f"{slot // 2:02d}{30 * (slot % 2):02d}Z", 'bench', f"BENCH-Twr-{n}")
+            for n in range(spec['files'] // 48 + 1) for slot in range(48)][:spec['files']]
+    with ArchiveServer(latency=spec['latency'], missing_rate=spec['missing_rate'], size=spec['size']) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        summary = download_many(jobs, workers=spec['workers'], max_per_host=spec['workers'], base_url=server.url)
+        requests = dict(server.requests)
+
+    return {'seconds': summary['elapsed'], 'ok': summary['ok'], 'failed': summary['failed'],
+            'files_per_s': summary['total'] / summary['elapsed'], 'mb_per_s': summary['bytes'] / 1e6 / summary['elapsed'],
+            'requests': requests, 'peak_rss_mb': peakRssMb()}
+
+
+def runBatchScaling(spec):
+    from audioProcess.batch import runBatch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = [(path, os.path.join(tmp, f"out-{i}.wav")) for i, path in enumerate(spec['paths'])]
+        started = time.perf_counter()
+        results = runBatch(jobs, workers=spec['workers'], options={'filter_type': 'fir'})
+        elapsed = time.perf_counter() - started
+
+    audio_seconds = spec['minutes'] * 60 * len(jobs)
+    return {'seconds': elapsed, 'ok': sum(r['ok'] for r in results), 'x_realtime': audio_seconds / elapsed}
+
+
+def runSignals(spec):
+    from benchmarks.signals import writeAtcLikeFile
+
+    return {'paths': [writeAtcLikeFile(path, seconds, sample_rate, seed) for path, seconds, sample_rate, seed in spec['files']]}
+
+
+def runChild(spec):
+    runner = {'dsp': runDspStage, 'download': runDownload, 'batch': runBatchScaling, 'signals': runSignals}[spec['kind']]
+    # Benchmarks measure the code, not its logging.
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            result = runner(spec)
+        finally:
+            sys.stdout = stdout
+    print(json.dumps(result))
+
+
+def spawn(spec):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, '-m', 'benchmarks.run', '--child', json.dumps(spec)],
+                               cwd=root, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def csvList(kind):
+    return lambda value: [kind(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks for the DSP and download hot paths')
+    parser.add_argument('--suite', type=csvList(str), default=['dsp', 'download', 'batch'])
+    parser.add_argument('--rates', type=csvList(int), default=[8000, 16000, 48000])
+    parser.add_argument('--minutes', type=csvList(float), default=[1, 5])
+    parser.add_argument('--stages', type=csvList(str), default=DSP_STAGES)
+    parser.add_argument('--workers', type=csvList(int), default=[1, 2, 4])
+    parser.add_argument('--files', type=int, default=48, help='archives per download run / batch run')
+    parser.add_argument('--size', type=int, default=512 * 1024, help='bytes per simulated archive')
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated server latency (s)')
+    parser.add_argument('--missing-rate', type=float, default=0.1, help='fraction of simulated 404 slots')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        runChild(json.loads(args.child))
+        return
+
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'python': platform.python_version(),
+              'machine': platform.machine(), 'cpus': os.cpu_count(), 'commit': gitCommit(), 'results': []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if 'dsp' in args.suite:
+            for sample_rate in args.rates:
+                for minutes in args.minutes:
+                    path = os.path.join(tmp, f"atc-{sample_rate}-{minutes}.wav")
+                    spawn({'kind': 'signals', 'files': [(path, minutes * 60, sample_rate, args.seed)]})
+                    for stage in args.stages:
+                        spec = {'kind': 'dsp', 'stage': stage, 'path': path, 'sample_rate': sample_rate, 'minutes': minutes}
+                        report['results'].append({**spec, 'path': None, **spawn(spec)})
+                        print(f"dsp {stage} {sample_rate} Hz {minutes} min", file=sys.stderr)
+                    os.remove(path)
+
+        if 'download' in args.suite:
+            for workers in args.workers:
+                spec = {'kind': 'download', 'workers': workers, 'files': args.files, 'size': args.size,
+                        'latency': args.latency, 'missing_rate': args.missing_rate}
+                report['results'].append({**spec, **spawn(spec)})
+                print(f"download workers={workers}", file=sys.stderr)
+
+        if 'batch' in args.suite:
+            minutes = args.minutes[0]
+            paths = spawn({'kind': 'signals', 'files': [(os.path.join(tmp, f"batch-{i}.wav"), minutes * 60, 16000, args.seed + i)
+                                                        for i in range(max(args.workers) * 2)]})['paths']
+            for workers in args.workers:
+                spec = {'kind': 'batch', 'workers': workers, 'paths': paths, 'minutes': minutes}
+                report['results'].append({**spec, 'paths': len(paths), **spawn(spec)})
+                print(f"batch workers={workers}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+def gitCommit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    main()
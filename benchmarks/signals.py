@@ -0,0 +1,44 @@
+import numpy as np
+from scipy import signal
+import soundfile as sf
+
+
+def atcLikeSignal(seconds, sample_rate=16000, seed=0, speech_ratio=0.2, noise_dbfs=-50.0, speech_dbfs=-18.0):
+    """Deterministic ATC-like test signal: band-limited voiced bursts over a radio noise floor (float32).
+
+    Bursts are harmonic series on a drifting pitch, amplitude-modulated at syllable rate and
+    band-limited to 300-3400 Hz, spaced so that roughly `speech_ratio` of the time is speech.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    high = min(3400, sample_rate / 2 - 100)
+    sos = signal.butter(4, [300, high], btype='bandpass', output='sos', fs=sample_rate)
+
+    noise = signal.sosfilt(sos, rng.standard_normal(n))
+    noise *= 10 ** (noise_dbfs / 20) / (np.sqrt(np.mean(noise**2)) + 1e-12)
+    audio = noise
+
+    mean_gap = 3.0 * (1 - speech_ratio) / max(speech_ratio, 1e-3)
+    t = 0.0
+    while True:
+        t += rng.uniform(0.2, 1.8) * mean_gap
+        duration = rng.uniform(1.0, 5.0)
+        start, stop = int(t * sample_rate), int(min(t + duration, seconds) * sample_rate)
+        if start >= n:
+            break
+        tt = np.arange(stop - start) / sample_rate
+        pitch = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * tt))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 16))
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 6) * tt)) ** 2
+        burst = signal.sosfilt(sos, voiced * envelope)
+        burst *= 10 ** (speech_dbfs / 20) / (np.sqrt(np.mean(burst**2)) + 1e-12)
+        audio[start:stop] += burst
+        t += duration
+
+    return np.clip(audio, -1.0, 1.0).astype(np.float32)
+
+
+def writeAtcLikeFile(path, seconds, sample_rate=16000, seed=0, **kwargs):
+    sf.write(path, atcLikeSignal(seconds, sample_rate, seed, **kwargs), sample_rate, subtype='FLOAT')
+    return path
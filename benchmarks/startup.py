@@ -0,0 +1,129 @@
+"""CLI startup time: how long `main.py` takes before it does any work.
+
+Each case is run several times in a fresh interpreter; the median wall time is reported next to a
+bare `python -c pass`, along with any heavy dependency the command imported. `stations` is answered
+from a seeded cache and `download` fetches one slot from the local archive server (timed until its first request), so
+nothing touches the network. Exits with status 1 when a budgeted case goes over `--budget-ms` (CLI overhead on top
+of the bare interpreter) or imports a dependency it should not:
+
+    python -m benchmarks.startup --runs 15 --budget-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.archive_server import ArchiveServer
+
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+HEAVY = ['requests', 'bs4', 'lxml', 'numpy', 'scipy', 'librosa', 'soundfile', 'webrtcvad', 'resampy', 'pydub',
+         'noisereduce', 'pyarrow']
+
+# name: (main.py arguments, dependencies it may import, whether it counts against the budget)
+CASES = {
+    'help': (['--help'], set(), True),
+    'stations_help': (['stations', '--help'], set(), True),
+    'download_help': (['download', '--help'], set(), True),
+    'process_help': (['process', '--help'], set(), True),
+    'stations_cached': (['stations', 'KPDX'], set(), True),
+    # Timed until the archive sees the first request; a single download goes through urllib.
+    'download': (['download', 'kpdx_app', '-p', 'KPDX-App', '-d', 'Jul-10-2025', '-t', '0000Z'], set(), True),
+}
+
+
+def seedStationsCache(cache_dir):
+    os.makedirs(os.path.join(cache_dir, 'stations'), exist_ok=True)
+    entry = {'fetched_at': time.time(), 'etag': None, 'last_modified': None,
+             'stations': [{'identifier': 'kpdx_app', 'title': 'KPDX Approach', 'up': True,
+                           'frequencies': [{'title': 'Approach', 'frequency': '124.350'}]}]}
+    with open(os.path.join(cache_dir, 'stations', 'KPDX.json'), 'w') as f:
+        json.dump(entry, f)
+
+
+def importedModules(args, env, cwd):
+    """Top-level packages imported by one run, from `-X importtime`."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime'] + args, env=env, cwd=cwd,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = set()
+    for line in completed.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+
+def timeRuns(args, env, cwd, runs, before=None):
+    """Wall times in ms; `before()` runs before each launch and can return a callable giving the stop time."""
+    times = []
+    for _ in range(runs):
+        stopAt = before() if before else None
+        started = time.monotonic()
+        subprocess.run([sys.executable] + args, env=env, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+        finished = stopAt() if stopAt else time.monotonic()
+        times.append((finished - started) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI startup time per command')
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='maximum CLI overhead over a bare interpreter')
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--output', help='also write the JSON report here')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, ArchiveServer(size=16 * 1024) as server:
+        env = dict(os.environ, LIVEATC_CACHE_DIR=os.path.join(tmp, 'cache'), LIVEATC_ARCHIVE_URL=server.url)
+        env.pop('LIVEATC_PROFILE', None)
+        seedStationsCache(env['LIVEATC_CACHE_DIR'])
+
+        firstRequest = []
+        original = server.count
+
+        def count(method):
+            firstRequest.append(time.monotonic())
+            original(method)
+
+        server.count = count
+
+        def resetDownload():
+            # Start from nothing each time, so every run really downloads.
+            for root, _, files in os.walk(os.path.join(tmp, 'downloads')):
+                for name in files:
+                    os.remove(os.path.join(root, name))
+            firstRequest.clear()
+            return lambda: firstRequest[0]
+
+        interpreter = statistics.median(timeRuns(['-c', 'pass'], env, tmp, args.runs))
+        results = {}
+        for name in args.cases.split(','):
+            cli_args, allowed, budgeted = CASES[name]
+            cli_args = [MAIN] + cli_args
+            times = timeRuns(cli_args, env, tmp, args.runs, resetDownload if name == 'download' else None)
+            median = statistics.median(times)
+            heavy = sorted(set(HEAVY) & importedModules(cli_args, env, tmp) - allowed)
+            results[name] = {
+                'median_ms': round(median, 1),
+                'min_ms': round(min(times), 1),
+                'overhead_ms': round(median - interpreter, 1),
+                'heavy_imports': heavy,
+                'budgeted': budgeted,
+                'ok': not heavy and (not budgeted or median - interpreter <= args.budget_ms),
+            }
+
+    report = {'python': sys.version.split()[0], 'interpreter_ms': round(interpreter, 1), 'budget_ms': args.budget_ms,
+              'runs': args.runs, 'cases': results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    sys.exit(0 if all(case['ok'] for case in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
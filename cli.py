@@ -2,16 +2,22 @@ import argparse
 import sys
 
 parser = argparse.ArgumentParser()
+parser.add_argument('--profile', metavar='PATH', help='Gravar tempo, CPU, bytes e memória por etapa em PATH (JSON lines) e mostrar um resumo no fim; também via LIVEATC_PROFILE')
 
 commands = parser.add_subparsers(title='command', dest='command')
 
 parser_stations = commands.add_parser('stations', help='List stations for a given airport')
-parser_stations.add_argument('icao', help='Airport ICAO code, e.g. KPDX')
+parser_stations.add_argument('icao', nargs='+', help='Airport ICAO code(s), e.g. KPDX; several codes are resolved concurrently')
+parser_stations.add_argument('-w', '--workers', type=int, default=8, help='Concurrent lookups for several ICAO codes (default: 8)')
+parser_stations.add_argument('--ttl', type=float, default=24, help='Hours a cached station list stays fresh (default: 24)')
+parser_stations.add_argument('--refresh', action='store_true', help='Ignore the station cache and fetch again')
 
 parser_download = commands.add_parser('download', help='Download MP3 archive for a given station')
 parser_download.add_argument('station', help='Station identifier, e.g. kpdx_app')
 parser_download.add_argument('-d', '--date', help='Archive date, e.g. Oct-01-2021 defaults to current date (LiveATC only saves archives for 30 days)')
 parser_download.add_argument('-t', '--time', help='Archive Zulu time, e.g. 0000Z, defaults to current time')
+parser_download.add_argument('-p', '--prefix', required=True, help='Archive file name prefix, e.g. KPDX-App')
+parser_download.add_argument('-f', '--folder', help='Folder under downloads/, defaults to the airport part of the station, e.g. kpdx')
 parser_multi = commands.add_parser("download-multi", help="Baixar várias faixas e feeds")
 parser_multi.add_argument("--icao", required=True, help="Código ICAO do aeroporto")
 parser_multi.add_argument("--date", required=True, help="Data, ex: Jul-10-2025")
@@ -19,7 +25,94 @@ parser_multi.add_argument("--start", required=True, help="Hora inicial, ex: 0000
 parser_multi.add_argument("--end", required=True, help="Hora final, ex: 2330Z")
 parser_multi.add_argument("--feeds", nargs='+', required=True,
                           help="Lista de feeds no formato station,prefix,folder (ex: sbrf_12960,SBRF-App-12960,sbrf)")
+parser_multi.add_argument("--workers", type=int, default=4, help="Número de downloads simultâneos (padrão: 4)")
+parser_multi.add_argument("--max-per-host", type=int, default=4, help="Máximo de conexões abertas por host (padrão: 4)")
+parser_multi.add_argument("--force", action="store_true", help="Baixar novamente mesmo arquivos já completos no manifesto")
+parser_multi.add_argument("--verify", action="store_true", help="Conferir o hash SHA-256 dos arquivos locais antes de pular")
+parser_multi.add_argument("--probe", action="store_true", help="Verificar (HEAD) quais horários existem antes de baixar")
+parser_multi.add_argument("--ttl", type=float, default=6, help="Horas que um 404 fica em cache e não é pedido de novo, com ou sem --probe (padrão: 6)")
 
+parser_probe = commands.add_parser("probe", help="Mapear quais horários existem no servidor (HEAD, em paralelo)")
+parser_probe.add_argument("--feeds", nargs='+', required=True, help="Feeds no formato station,prefix,folder")
+parser_probe.add_argument("--date", help="Data, ex: Jul-10-2025; padrão: toda a janela de retenção")
+parser_probe.add_argument("--days", type=int, default=30, help="Dias da janela de retenção (padrão: 30)")
+parser_probe.add_argument("--start", default="0000Z", help="Hora inicial (padrão: 0000Z)")
+parser_probe.add_argument("--end", default="2330Z", help="Hora final (padrão: 2330Z)")
+parser_probe.add_argument("--workers", type=int, default=8, help="Número de verificações simultâneas (padrão: 8)")
+parser_probe.add_argument("--max-per-host", type=int, default=4, help="Máximo de conexões abertas por host (padrão: 4)")
+parser_probe.add_argument("--ttl", type=float, default=6, help="Horas que um 404 fica em cache (padrão: 6)")
+
+parser_missing = commands.add_parser("missing", help="Listar horários ausentes no disco (sem acessar a rede)")
+parser_missing.add_argument("--icao", required=True, help="Código ICAO do aeroporto")
+parser_missing.add_argument("--date", required=True, help="Data, ex: Jul-10-2025")
+parser_missing.add_argument("--start", default="0000Z", help="Hora inicial (padrão: 0000Z)")
+parser_missing.add_argument("--end", default="2330Z", help="Hora final (padrão: 2330Z)")
+parser_missing.add_argument("--feeds", nargs='+',
+                            help="Feeds no formato station,prefix,folder; padrão: estações do ICAO no manifesto")
+
+parser_process = commands.add_parser("process", help="Processar em paralelo os MP3 de downloads/<folder>/<station>/")
+parser_process.add_argument("files", nargs='*', help="MP3 específicos; padrão: todos os encontrados em --root")
+parser_process.add_argument("--root", default="downloads", help="Diretório raiz dos downloads (padrão: downloads)")
+parser_process.add_argument("--folder", help="Processar apenas esta pasta, ex: sbrf")
+parser_process.add_argument("--station", help="Processar apenas esta estação, ex: sbrf_12960")
+parser_process.add_argument("--output-dir", help="Diretório de saída; padrão: ao lado de cada MP3")
+parser_process.add_argument("--suffix", help="Sufixo do arquivo gerado (padrão: _fir ou _iir, conforme --filter)")
+parser_process.add_argument("--filter", choices=["fir", "iir"], default="fir", help="Filtro passa-faixa (padrão: fir)")
+parser_process.add_argument("--streaming", action="store_true", help="Processar em blocos com memória limitada")
+parser_process.add_argument("--pcm-cache", action="store_true", help="Reutilizar o PCM decodificado em cache")
+parser_process.add_argument("--format", choices=["wav", "flac", "opus"], default="wav",
+                            help="wav: sinal completo; flac/opus: só os trechos de fala a 16 kHz, com índice .segments.json (padrão: wav)")
+parser_process.add_argument("--workers", type=int, help="Número de processos (padrão: número de CPUs)")
+parser_process.add_argument("--force", action="store_true", help="Reprocessar mesmo saídas atualizadas")
+parser_split = commands.add_parser("split", help="Cortar cada transmissão em um clipe (para ASR)")
+parser_split.add_argument("--root", default="downloads", help="Diretório raiz dos downloads (padrão: downloads)")
+parser_split.add_argument("--folder", help="Processar apenas esta pasta, ex: sbrf")
+parser_split.add_argument("--station", help="Processar apenas esta estação, ex: sbrf_12960")
+parser_split.add_argument("--output-dir", help="Diretório dos clipes; padrão: clips/ ao lado de cada MP3")
+parser_split.add_argument("--index", help="CSV com (file, start, end, clip); padrão: <root>/clips_index.csv")
+parser_split.add_argument("--padding-ms", type=int, default=250, help="Margem antes/depois de cada transmissão (padrão: 250)")
+parser_split.add_argument("--no-noise-reduce", action="store_true", help="Não aplicar redução de ruído nos clipes")
+parser_split.add_argument("--keep-original", action="store_true", help="Gravar também o clipe sem redução de ruído")
+parser_split.add_argument("--workers", type=int, help="Número de processos (padrão: número de CPUs)")
+parser_metrics = commands.add_parser("metrics", help="Avaliar métricas (audio_compare) sobre arquivos × conjuntos de parâmetros")
+parser_metrics.add_argument("--root", default="downloads", help="Diretório raiz dos downloads (padrão: downloads)")
+parser_metrics.add_argument("--folder", help="Avaliar apenas esta pasta, ex: sbrf")
+parser_metrics.add_argument("--station", help="Avaliar apenas esta estação, ex: sbrf_12960")
+parser_metrics.add_argument("--grid", nargs='*', default=[],
+                            help="Parâmetros a variar, ex: mode=2,3 hang_ms=150,300 filter_type=fir,iir (demais: padrão do process)")
+parser_metrics.add_argument("--output", help="CSV ou .parquet com uma linha por arquivo × parâmetros; padrão: <root>/metrics.csv")
+parser_metrics.add_argument("--limit", type=int, help="Avaliar no máximo N arquivos")
+parser_metrics.add_argument("--pcm-cache", action="store_true", help="Reutilizar o PCM decodificado em cache")
+parser_metrics.add_argument("--workers", type=int,
+                            help="Número de processos, cada um com até ~3,5 GB por arquivo de 30 min "
+                                 "(padrão: número de CPUs, limitado pela memória)")
+parser_timeline = commands.add_parser("timeline", help="Processar horários consecutivos de uma estação como um sinal contínuo")
+parser_timeline.add_argument("--root", default="downloads", help="Diretório raiz dos downloads (padrão: downloads)")
+parser_timeline.add_argument("--folder", required=True, help="Pasta da estação, ex: sbrf")
+parser_timeline.add_argument("--station", required=True, help="Estação, ex: sbrf_12960")
+parser_timeline.add_argument("--date", required=True, help="Data, ex: Jul-10-2025")
+parser_timeline.add_argument("--start", default="0000Z", help="Hora inicial (padrão: 0000Z)")
+parser_timeline.add_argument("--end", default="2330Z", help="Hora final (padrão: 2330Z)")
+parser_timeline.add_argument("--format", choices=["memmap", "shards"], default="memmap",
+                             help="Um .npy float32 contínuo (memmap) ou um WAV por horário (shards) (padrão: memmap)")
+parser_timeline.add_argument("--output", help="Arquivo .npy ou diretório dos shards; padrão: <station>-<date>-timeline ao lado dos MP3")
+parser_timeline.add_argument("--filter", choices=["fir", "iir"], default="fir", help="Filtro passa-faixa (padrão: fir)")
+parser_follow = commands.add_parser("follow", help="Acompanhar feeds: baixar cada horário novo assim que publicado e processá-lo")
+parser_follow.add_argument("--feeds", nargs='+', required=True,
+                           help="Lista de feeds no formato station,prefix,folder (ex: sbrf_12960,SBRF-App-12960,sbrf)")
+parser_follow.add_argument("--delay", type=float, default=2, help="Minutos após o fim do horário para a primeira tentativa (padrão: 2)")
+parser_follow.add_argument("--backoff", type=float, default=1, help="Espera inicial em minutos entre tentativas, dobrando a cada 404 (padrão: 1)")
+parser_follow.add_argument("--max-backoff", type=float, default=15, help="Espera máxima em minutos entre tentativas (padrão: 15)")
+parser_follow.add_argument("--give-up", type=float, default=6, help="Horas após o fim do horário para desistir (padrão: 6)")
+parser_follow.add_argument("--workers", type=int, default=4, help="Número de downloads simultâneos (padrão: 4)")
+parser_follow.add_argument("--max-per-host", type=int, default=4, help="Máximo de conexões abertas por host (padrão: 4)")
+parser_follow.add_argument("--process", action="store_true", help="Processar cada arquivo baixado (filtro, VAD, normalização)")
+parser_follow.add_argument("--filter", choices=["fir", "iir"], default="fir", help="Filtro passa-faixa (padrão: fir)")
+parser_follow.add_argument("--streaming", action="store_true", help="Processar em blocos com memória limitada")
+parser_follow.add_argument("--process-workers", type=int, default=1, help="Número de processos de processamento (padrão: 1)")
+parser_follow.add_argument("--queue-size", type=int, default=8, help="Arquivos baixados aguardando processamento (padrão: 8)")
+parser_follow.add_argument("--output-dir", help="Diretório de saída; padrão: ao lado de cada MP3")
+parser_follow.add_argument("--suffix", help="Sufixo do arquivo gerado (padrão: _fir ou _iir, conforme --filter)")
 
 
 def get_args():
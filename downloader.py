@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from liveatc import download_archive, make_session, probe_archive, remote_size
+
+
+def download_many(jobs, workers=4, max_per_host=4, base_url=None, on_result=None, session=None):
+  """Download `(station, date, time, folder, prefix)` jobs concurrently over one shared session.
+
+  `on_result` is called from the calling thread with each finished result. A `session` passed in
+  is used as is and left open, for callers that download in many rounds.
+  """
+  own_session = session is None
+  session = session or make_session(max_per_host)
+  started = time.monotonic()
+  results = []
+
+  try:
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+      futures = [pool.submit(download_archive, *job, session=session, base_url=base_url) for job in jobs]
+      for future in as_completed(futures):
+        result = future.result()
+        if on_result:
+          on_result(result)
+        results.append(result)
+  finally:
+    if own_session:
+      session.close()
+
+  return summarize(results, time.monotonic() - started)
+
+
+def probe_many(jobs, workers=8, max_per_host=4, base_url=None):
+  """HEAD-probe download jobs concurrently. Returns {job: True | False | None}."""
+  session = make_session(max_per_host)
+  availability = {}
+
+  try:
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+      futures = {}
+      for job in jobs:
+        station, date, slot, _, prefix = job
+        futures[pool.submit(probe_archive, station, date, slot, prefix, session=session, base_url=base_url)] = job
+      for future in as_completed(futures):
+        availability[futures[future]] = future.result()
+  finally:
+    session.close()
+
+  return availability
+
+
+def remote_sizes(jobs, workers=8, max_per_host=4, base_url=None):
+  """HEAD download jobs concurrently for their size on the server. Returns {job: bytes or None}."""
+  session = make_session(max_per_host)
+  sizes = {}
+
+  try:
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+      futures = {}
+      for job in jobs:
+        station, date, slot, _, prefix = job
+        futures[pool.submit(remote_size, station, date, slot, prefix, session=session, base_url=base_url)] = job
+      for future in as_completed(futures):
+        sizes[futures[future]] = future.result()
+  finally:
+    session.close()
+
+  return sizes
+
+
+def summarize(results, elapsed):
+  ok = [r for r in results if r['ok']]
+  total_bytes = sum(r['bytes'] for r in ok)
+  return {
+    'total': len(results),
+    'skipped': 0,
+    'ok': len(ok),
+    'failed': len(results) - len(ok),
+    'bytes': total_bytes,
+    'elapsed': elapsed,
+    'rate': total_bytes / elapsed if elapsed > 0 else 0.0,
+    'failures': [r for r in results if not r['ok']],
+  }
+
+
+def print_summary(summary):
+  print()
+  print(f"📊 Resumo: {summary['ok']}/{summary['total']} arquivos baixados, {summary['failed']} falhas, "
+        f"{summary['skipped']} já presentes")
+  print(f"\t{summary['bytes'] / 1e6:.1f} MB em {summary['elapsed']:.1f} s ({summary['rate'] / 1e6:.2f} MB/s)")
+  for failure in summary['failures']:
+    print(f"\t❌ {failure['station']}/{failure['filename']}: {failure['error']}")
@@ -0,0 +1,200 @@
+"""Follow mode: fetch each new 30-minute slot of a set of feeds as soon as LiveATC publishes it.
+
+Slot `HHMMZ` covers HH:MM to HH:MM+30 and shows up on the archive some minutes after it ends. Each
+slot is first requested `delay` seconds after its end; a 404 is retried with exponential backoff
+(`backoff` doubling up to `max_backoff`) until `give_up` seconds after its end, and slots already
+complete in the manifest are never requested. Downloaded files reach the processing pool through a
+bounded queue, so a pipeline that falls behind throttles the downloads instead of piling up work.
+"""
+import heapq
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import instrumentation
+from downloader import download_many
+from liveatc import make_session
+
+
+SLOT = timedelta(minutes=30)
+
+
+class Clock:
+  """Naive UTC wall clock, as used throughout main.py."""
+
+  def now(self):
+    return datetime.utcnow()
+
+  def sleep(self, seconds):
+    time.sleep(max(0.0, seconds))
+
+
+class SimulatedClock:
+  """Clock that jumps forward on `sleep`, to replay hours of follow mode in seconds against a stand-in server."""
+
+  def __init__(self, start):
+    self.current = start
+
+  def now(self):
+    return self.current
+
+  def sleep(self, seconds):
+    self.current += timedelta(seconds=max(0.0, seconds))
+
+
+def slot_start(moment):
+  return moment - (moment - datetime.min) % SLOT
+
+
+def slot_job(feed, slot):
+  station, prefix, folder = feed
+  return station, slot.strftime('%b-%d-%Y'), slot.strftime('%H%MZ'), folder, prefix
+
+
+class Follower:
+
+  def __init__(self, feeds, manifest, clock=None, delay=120, backoff=60, max_backoff=900, give_up=6 * 3600,
+               workers=4, max_per_host=4, base_url=None, process_options=None, process_workers=1, queue_size=8,
+               suffix=None, output_dir=None):
+    """`feeds` are (station, prefix, folder) tuples; processing runs only when `process_options` is given."""
+    self.feeds = list(feeds)
+    self.manifest = manifest
+    self.clock = clock or Clock()
+    self.delay = timedelta(seconds=delay)
+    self.backoff = backoff
+    self.max_backoff = max_backoff
+    self.give_up = timedelta(seconds=give_up)
+    self.workers = workers
+    self.max_per_host = max_per_host
+    self.base_url = base_url
+    self.process_options = process_options
+    self.process_workers = process_workers
+    self.suffix = suffix
+    self.output_dir = output_dir
+
+    self.pending = []
+    self.attempts = {}
+    self.processing = queue.Queue(maxsize=queue_size)
+    self.processed = queue.Queue()
+    self.session = None
+    # `requests` counts HTTP requests (retries included), not scheduled slots.
+    self.stats = {'requests': 0, 'downloaded': 0, 'gave_up': 0, 'processed': 0, 'process_failed': 0,
+                  'download_latency': [], 'process_latency': []}
+
+  def schedule(self, feed, slot, due, attempt=0):
+    heapq.heappush(self.pending, (due, slot_job(feed, slot), feed, slot, attempt))
+
+  def run(self, since=None, until=None):
+    """Follow the feeds from the last slot that can already be published (or `since`) until `until` or Ctrl-C."""
+    first = slot_start(since) if since else slot_start(self.clock.now() - self.delay) - SLOT
+    for feed in self.feeds:
+      self.schedule(feed, first, first + SLOT + self.delay)
+
+    self.session = make_session(self.max_per_host)
+    consumer = None
+    if self.process_options is not None:
+      consumer = threading.Thread(target=self._process_loop, daemon=True)
+      consumer.start()
+
+    try:
+      while self.pending:
+        self._drain_processed()
+        due = self.pending[0][0]
+        if until is not None and due > until:
+          break
+        now = self.clock.now()
+        if due > now:
+          # Wake up regularly while files are being processed, to record their results.
+          wait = (due - now).total_seconds()
+          self.clock.sleep(min(wait, 10) if consumer is not None else wait)
+          continue
+        self._run_due(now)
+    except KeyboardInterrupt:
+      instrumentation.log("⏹️  Interrompido, aguardando o processamento em andamento")
+    finally:
+      if consumer is not None:
+        self.processing.put(None)
+        consumer.join()
+      self._drain_processed()
+      self.session.close()
+      self.session = None
+
+    return self.stats
+
+  def _run_due(self, now):
+    jobs = []
+    while self.pending and self.pending[0][0] <= now:
+      _, job, feed, slot, attempt = heapq.heappop(self.pending)
+      if attempt == 0:
+        self.schedule(feed, slot + SLOT, slot + 2 * SLOT + self.delay)
+      station, date, time, _, _ = job
+      if self.manifest.is_complete(station, date, time):
+        continue
+      self.attempts[job] = (feed, slot, attempt)
+      jobs.append(job)
+
+    if jobs:
+      download_many(jobs, workers=self.workers, max_per_host=self.max_per_host, base_url=self.base_url,
+                    on_result=self._on_result, session=self.session)
+
+  def _on_result(self, result):
+    self.stats['requests'] += result['requests']
+    self.manifest.record_result(result)
+    job = (result['station'], result['date'], result['time'], result['folder'], result['prefix'])
+    feed, slot, attempt = self.attempts.pop(job)
+    now = self.clock.now()
+
+    if result['ok']:
+      self.stats['downloaded'] += 1
+      self.stats['download_latency'].append((now - slot - SLOT).total_seconds())
+      if self.process_options is not None:
+        # Blocks while the processing queue is full.
+        self.processing.put((job, slot, result['path']))
+      return
+
+    retry_at = now + timedelta(seconds=min(self.max_backoff, self.backoff * 2 ** attempt))
+    if retry_at - slot - SLOT > self.give_up:
+      self.stats['gave_up'] += 1
+      instrumentation.log(f"⌛ {result['filename']} não apareceu após {self.give_up}, desistindo", file=result['filename'])
+      return
+    self.schedule(feed, slot, retry_at, attempt + 1)
+
+  def _process_loop(self):
+    from audioProcess.batch import outputPathFor, processFile
+
+    in_flight = threading.Semaphore(2 * self.process_workers)
+    with ProcessPoolExecutor(max_workers=self.process_workers) as pool:
+      for job, slot, mp3_path in iter(self.processing.get, None):
+        in_flight.acquire()
+        output_path = outputPathFor(mp3_path, self.suffix, self.output_dir,
+                                    filter_type=self.process_options.get('filter_type', 'fir'))
+        future = pool.submit(processFile, mp3_path, output_path, self.process_options)
+
+        def done(future, job=job, slot=slot):
+          in_flight.release()
+          try:
+            result = future.result()
+          except Exception as e:
+            result = {'input': None, 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+          self.processed.put((job, slot, result))
+
+        future.add_done_callback(done)
+
+  def _drain_processed(self):
+    # The manifest connection belongs to this thread, so decode statuses are written here.
+    while True:
+      try:
+        job, slot, result = self.processed.get_nowait()
+      except queue.Empty:
+        return
+      station, date, time, _, _ = job
+      self.manifest.set_decode_status(station, date, time, 'ok' if result['ok'] else 'error')
+      if result['ok']:
+        self.stats['processed'] += 1
+        self.stats['process_latency'].append((self.clock.now() - slot - SLOT).total_seconds())
+        instrumentation.log(f"✅ {result['output']} ({result['segments']} segmentos, {result['seconds']:.1f} s)")
+      else:
+        self.stats['process_failed'] += 1
+        instrumentation.log(f"❌ {result['input']}: {result['error']}")
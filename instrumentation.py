@@ -0,0 +1,141 @@
+"""Per-stage timing and memory instrumentation.
+
+Disabled by default. `python main.py --profile PATH ...` (or `LIVEATC_PROFILE=PATH`) appends one JSON
+line per stage to PATH with wall time, CPU time, bytes processed and peak allocated memory
+(`tracemalloc`; `LIVEATC_PROFILE_MEMORY=0` skips it), and prints a per-stage summary at the end.
+The settings travel through the environment, so worker processes write to the same file.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+PROFILE_ENV = 'LIVEATC_PROFILE'
+MEMORY_ENV = 'LIVEATC_PROFILE_MEMORY'
+RUN_ENV = 'LIVEATC_PROFILE_RUN'
+
+# Yields a scratch dict nobody reads, so callers can fill in `bytes` without checking.
+_DISABLED = contextlib.nullcontext({})
+_lock = threading.Lock()
+_local = threading.local()
+_config = {'path': None, 'memory': False, 'run': None}
+
+
+def enable(path, memory=True):
+  os.environ[PROFILE_ENV] = path
+  os.environ[MEMORY_ENV] = '1' if memory else '0'
+  os.environ.setdefault(RUN_ENV, f"{int(time.time())}-{os.getpid()}")
+  _config.update(path=path, memory=memory, run=os.environ[RUN_ENV])
+  if memory and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def enabled():
+  return _config['path'] is not None
+
+
+def emit(record):
+  record = {'run': _config['run'], 'ts': round(time.time(), 6), 'pid': os.getpid(), **record}
+  line = json.dumps(record, ensure_ascii=False) + '\n'
+  with _lock, open(_config['path'], 'a', encoding='utf-8') as f:
+    f.write(line)
+
+
+def log(message, **fields):
+  """Status message for the console, also recorded in the profile when enabled."""
+  print(message)
+  if enabled():
+    emit({'event': message, **fields})
+
+
+class _Stage:
+
+  def __init__(self, name, file, nbytes, memory):
+    self.record = {'stage': name, 'file': file, 'bytes': nbytes}
+    self.memory = memory and _config['memory'] and threading.current_thread() is threading.main_thread()
+
+  def __enter__(self):
+    if self.memory:
+      # tracemalloc has a single peak per process: fold it into the enclosing stages before resetting.
+      stack = _local.__dict__.setdefault('stack', [])
+      peak = tracemalloc.get_traced_memory()[1]
+      for outer in stack:
+        outer.peak = max(outer.peak, peak)
+      tracemalloc.reset_peak()
+      self.base = tracemalloc.get_traced_memory()[0]
+      self.peak = 0
+      stack.append(self)
+    self.wall = time.perf_counter()
+    self.cpu = time.process_time()
+    return self.record
+
+  def __exit__(self, exc_type, exc, tb):
+    record = self.record
+    record['wall_s'] = round(time.perf_counter() - self.wall, 6)
+    record['cpu_s'] = round(time.process_time() - self.cpu, 6)
+    if self.memory:
+      _local.stack.pop()
+      peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+      for outer in _local.stack:
+        outer.peak = max(outer.peak, peak)
+      record['alloc_peak_bytes'] = max(0, peak - self.base)
+    if exc_type is not None:
+      record['error'] = exc_type.__name__
+    emit(record)
+    return False
+
+
+def stage(name, file=None, nbytes=None, memory=True):
+  """Context manager timing one pipeline stage; yields its record so `bytes` can be set afterwards.
+
+  Returns a shared no-op context when instrumentation is off.
+  """
+  if _config['path'] is None:
+    return _DISABLED
+  return _Stage(name, file, nbytes, memory)
+
+
+def summarize(path=None, run=None):
+  """Aggregate the stage records of one run (default: the current one) per stage name."""
+  path = path or _config['path']
+  run = run or _config['run']
+  stages = {}
+  with open(path, encoding='utf-8') as f:
+    for line in f:
+      record = json.loads(line)
+      if 'stage' not in record or record.get('run') != run:
+        continue
+      entry = stages.setdefault(record['stage'], {'stage': record['stage'], 'count': 0, 'files': set(), 'wall_s': 0.0,
+                                                  'cpu_s': 0.0, 'bytes': 0, 'alloc_peak_bytes': 0, 'errors': 0})
+      entry['count'] += 1
+      entry['files'].add(record.get('file'))
+      entry['wall_s'] += record['wall_s']
+      entry['cpu_s'] += record['cpu_s']
+      entry['bytes'] += record.get('bytes') or 0
+      entry['alloc_peak_bytes'] = max(entry['alloc_peak_bytes'], record.get('alloc_peak_bytes') or 0)
+      entry['errors'] += 'error' in record
+
+  rows = sorted(stages.values(), key=lambda entry: entry['wall_s'], reverse=True)
+  for entry in rows:
+    entry['files'] = len(entry['files'] - {None})
+  return rows
+
+
+def print_summary(path=None, run=None):
+  rows = summarize(path, run)
+  if not rows:
+    return
+  print()
+  print(f"⏱️  Perfil por etapa ({path or _config['path']}):")
+  print(f"\t{'etapa':<14}{'n':>6}{'arquivos':>10}{'parede s':>11}{'CPU s':>10}{'média ms':>11}{'MB':>10}{'MB/s':>9}{'pico MB':>10}")
+  for entry in rows:
+    rate = entry['bytes'] / 1e6 / entry['wall_s'] if entry['bytes'] and entry['wall_s'] else 0.0
+    print(f"\t{entry['stage']:<14}{entry['count']:>6}{entry['files']:>10}{entry['wall_s']:>11.2f}{entry['cpu_s']:>10.2f}"
+          f"{1000 * entry['wall_s'] / entry['count']:>11.1f}{entry['bytes'] / 1e6:>10.1f}{rate:>9.2f}"
+          f"{entry['alloc_peak_bytes'] / 1e6:>10.1f}" + (f"  ({entry['errors']} erros)" if entry['errors'] else ''))
+
+
+if os.environ.get(PROFILE_ENV):
+  enable(os.environ[PROFILE_ENV], memory=os.environ.get(MEMORY_ENV, '1') != '0')
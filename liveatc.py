@@ -1,18 +1,51 @@
+import importlib.util
+import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-import urllib.request
-from bs4 import BeautifulSoup
 import os
 
+import instrumentation
 
-def get_stations(icao):
-  page = requests.get(f'https://www.liveatc.net/search/?icao={icao}')
-  soup = BeautifulSoup(page.content, 'html.parser')
+# requests and bs4 are imported where they are used: they cost more than the rest of the CLI's startup
+# combined, and `stations` answered from the cache needs neither. A single `download` has no session to
+# share and goes through urllib instead.
+
+
+ARCHIVE_URL = os.environ.get('LIVEATC_ARCHIVE_URL', 'https://archive.liveatc.net')
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+CHUNK_SIZE = 64 * 1024
+
+SEARCH_URL = os.environ.get('LIVEATC_SEARCH_URL', 'https://www.liveatc.net/search/')
+CACHE_DIR = os.environ.get('LIVEATC_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'liveatc'))
+STATIONS_TTL = 24 * 3600
+# lxml is optional; it parses the search page several times faster than the pure-Python parser.
+PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+
+def make_session(max_per_host=4):
+  """Shared keep-alive session; at most `max_per_host` open connections per host."""
+  import requests
+  from requests.adapters import HTTPAdapter
+
+  session = requests.Session()
+  session.headers.update(HEADERS)
+  adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_per_host, pool_block=True)
+  session.mount('http://', adapter)
+  session.mount('https://', adapter)
+  return session
+
+
+def parse_stations(content):
+  from bs4 import BeautifulSoup, SoupStrainer
+
+  soup = BeautifulSoup(content, PARSER, parse_only=SoupStrainer('table'))
 
   stations = soup.find_all('table', class_='body', border='0', padding=lambda x: x != '0')
   freqs = soup.find_all('table', class_='freqTable', colspan='2')
 
+  result = []
   for table, freqs in zip(stations, freqs):
     title = table.find('strong').text
     up = table.find('font').text == 'UP'
@@ -29,27 +62,280 @@ def get_stations(icao):
 
       frequencies.append({'title': freq_title, 'frequency': freq_frequency})
 
-    yield {'identifier': identifier, 'title': title, 'frequencies': frequencies, 'up': up}
+    result.append({'identifier': identifier, 'title': title, 'frequencies': frequencies, 'up': up})
+
+  return result
+
+
+def _stations_cache_path(icao):
+  return os.path.join(CACHE_DIR, 'stations', f"{icao.upper()}.json")
+
+
+def _read_stations_cache(icao):
+  cache_path = _stations_cache_path(icao)
+  if not os.path.exists(cache_path):
+    return None
+  with open(cache_path) as f:
+    return json.load(f)
+
+
+def get_stations(icao, session=None, ttl=STATIONS_TTL, refresh=False):
+  """Stations for an airport, served from the disk cache while fresher than `ttl` seconds.
+
+  Stale entries are revalidated with If-None-Match/If-Modified-Since, so an unchanged page costs a 304.
+  """
+  cache_path = _stations_cache_path(icao)
+  cached = _read_stations_cache(icao)
+  if cached and not refresh and time.time() - cached['fetched_at'] < ttl:
+    return cached['stations']
+
+  import requests
+
+  headers = dict(HEADERS)
+  if cached and not refresh:
+    if cached.get('etag'):
+      headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+      headers['If-Modified-Since'] = cached['last_modified']
+
+  http = session or requests
+  page = http.get(f'{SEARCH_URL}?icao={icao}', headers=headers, timeout=30)
+  if page.status_code == 304 and cached:
+    entry = dict(cached, fetched_at=time.time())
+  else:
+    page.raise_for_status()
+    entry = {
+      'fetched_at': time.time(),
+      'etag': page.headers.get('ETag'),
+      'last_modified': page.headers.get('Last-Modified'),
+      'stations': parse_stations(page.content),
+    }
+
+  os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+  tmp_path = cache_path + '.tmp'
+  with open(tmp_path, 'w') as f:
+    json.dump(entry, f)
+  os.replace(tmp_path, cache_path)
+  return entry['stations']
+
+
+def get_stations_many(icaos, workers=8, ttl=STATIONS_TTL, refresh=False):
+  """Resolve many airports concurrently over one pooled session. Returns {icao: stations or exception}.
+
+  Airports whose cache entry is still fresh are answered without opening a session at all.
+  """
+  results = {}
+  to_fetch = []
+  for icao in icaos:
+    cached = None if refresh else _read_stations_cache(icao)
+    if cached and time.time() - cached['fetched_at'] < ttl:
+      results[icao] = cached['stations']
+    else:
+      to_fetch.append(icao)
+  if not to_fetch:
+    return {icao: results[icao] for icao in icaos}
+
+  session = make_session(max_per_host=workers)
+  try:
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+      futures = {pool.submit(get_stations, icao, session, ttl, refresh): icao for icao in to_fetch}
+      for future in as_completed(futures):
+        try:
+          results[futures[future]] = future.result()
+        except Exception as e:
+          results[futures[future]] = e
+  finally:
+    session.close()
+  return {icao: results[icao] for icao in icaos}
+
+
+def _fetch_to_part(http, url, part_path):
+    """Stream `url` into `part_path`, resuming from its current size. Returns (bytes written, complete, headers)."""
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = dict(HEADERS)
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+
+    with http.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 416 and offset:
+            # Range starts at or beyond the end: the partial file already holds everything.
+            return 0, True, response.headers
+        response.raise_for_status()
 
+        if response.status_code == 206:
+            total = int(response.headers.get('Content-Range', '*/0').rsplit('/', 1)[-1] or 0)
+            mode = 'ab'
+        else:
+            # Server ignored the Range header, start over.
+            offset = 0
+            total = int(response.headers.get('Content-Length') or 0)
+            mode = 'wb'
 
-def download_archive(station, date, time, folder, prefix):
+        written = 0
+        with open(part_path, mode) as out_file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                out_file.write(chunk)
+                written += len(chunk)
+
+    return written, not total or offset + written >= total, response.headers
+
+
+def _urlopen_to_part(url, part_path):
+    """`_fetch_to_part` over urllib, for a single download that does not need a requests session."""
+    import urllib.error
+    import urllib.request
+
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = dict(HEADERS)
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            e.close()
+            return 0, True, e.headers
+        raise
+
+    with response:
+        if response.status == 206:
+            total = int(response.headers.get('Content-Range', '*/0').rsplit('/', 1)[-1] or 0)
+            mode = 'ab'
+        else:
+            offset = 0
+            total = int(response.headers.get('Content-Length') or 0)
+            mode = 'wb'
+
+        written = 0
+        with open(part_path, mode) as out_file:
+            while chunk := response.read(CHUNK_SIZE):
+                out_file.write(chunk)
+                written += len(chunk)
+
+    return written, not total or offset + written >= total, response.headers
+
+
+def _head_archive(station, date, time, prefix, session=None, base_url=None):
+    """HEAD the archive (or GET its first byte where HEAD is unsupported); None if the request failed."""
+    import requests
+
+    url = f"{base_url or ARCHIVE_URL}/{station}/{prefix}-{date}-{time}.mp3"
+    http = session or requests
+    try:
+        response = http.head(url, headers=HEADERS, timeout=30, allow_redirects=True)
+        if response.status_code in (405, 501):
+            # No HEAD support: ask for the first byte instead.
+            with http.get(url, headers={**HEADERS, 'Range': 'bytes=0-0'}, stream=True, timeout=30) as response:
+                pass
+    except requests.RequestException:
+        return None
+    return response
+
+
+def probe_archive(station, date, time, prefix, session=None, base_url=None):
+    """HEAD the archive: True if it exists, False on 404/410, None when the answer is unknown."""
+    response = _head_archive(station, date, time, prefix, session, base_url)
+    if response is None:
+        return None
+    if response.status_code in (404, 410):
+        return False
+    if response.status_code in (200, 206):
+        return True
+    return None
+
+
+def remote_size(station, date, time, prefix, session=None, base_url=None):
+    """Size in bytes of the archive on the server, or None if it is absent or the server does not say."""
+    response = _head_archive(station, date, time, prefix, session, base_url)
+    if response is None:
+        return None
+    if response.status_code == 206:
+        total = response.headers.get('Content-Range', '*/').rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else None
+    if response.status_code == 200 and response.headers.get('Content-Length', '').isdigit():
+        return int(response.headers['Content-Length'])
+    return None
+
+
+def download_archive(station, date, time, folder, prefix, session=None, base_url=None, retries=3):
+    """Download one archive through `session`, or through urllib when there is none (a single `download`)."""
     filename = f"{prefix}-{date}-{time}.mp3"
-    url = f"https://archive.liveatc.net/{station}/{filename}"
+    url = f"{base_url or ARCHIVE_URL}/{station}/{filename}"
     local_dir = os.path.join("downloads", folder, station)
     os.makedirs(local_dir, exist_ok=True)
     path = os.path.join(local_dir, filename)
+    part_path = path + '.part'
+    result = {'station': station, 'date': date, 'time': time, 'folder': folder, 'prefix': prefix,
+              'filename': filename, 'path': path, 'ok': False, 'bytes': 0, 'error': None,
+              'etag': None, 'last_modified': None, 'status': None, 'requests': 0}
 
-    print(f"🔗 URL: {url}")
-    print(f"💾 Salvando em: {path}")
+    instrumentation.log(f"🔗 URL: {url}")
+    instrumentation.log(f"💾 Salvando em: {path}")
 
-    try:
-        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urllib.request.urlopen(req) as response, open(path, 'wb') as out_file:
-            out_file.write(response.read())
-        print("✅ Download concluído.")
-    except Exception as e:
-        print(f"❌ Erro ao baixar: {e}")
+    if session is None:
+        import http.client
+        import urllib.error
+
+        def fetch():
+            return _urlopen_to_part(url, part_path)
+
+        http_error = urllib.error.HTTPError
+        transient = (ConnectionError, TimeoutError, urllib.error.URLError, http.client.HTTPException)
+
+        def status_of(e):
+            return e.code
+    else:
+        import requests
+
+        def fetch():
+            return _fetch_to_part(session, url, part_path)
+
+        http_error = requests.HTTPError
+        transient = (ConnectionError, requests.ConnectionError, requests.Timeout,
+                     requests.exceptions.ChunkedEncodingError)
+
+        def status_of(e):
+            return e.response.status_code
+
+    resumed_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    with instrumentation.stage('download', filename, memory=False) as record:
+        for attempt in range(retries + 1):
+            result['requests'] += 1
+            try:
+                written, complete, headers = fetch()
+                if written and written == os.path.getsize(part_path):
+                    # The server ignored the Range header and sent everything again.
+                    resumed_from = 0
+                result['etag'] = headers.get('ETag') or result['etag']
+                result['last_modified'] = headers.get('Last-Modified') or result['last_modified']
+                if not complete:
+                    raise ConnectionError(f"transferência incompleta ({os.path.getsize(part_path)} bytes)")
+                result['bytes'] = max(0, os.path.getsize(part_path) - resumed_from)
+                os.replace(part_path, path)
+                result['ok'] = True
+                result['error'] = None
+                result['status'] = 200
+                instrumentation.log(f"✅ Download concluído: {filename}")
+                break
+            except http_error as e:
+                result['error'] = str(e)
+                result['status'] = status_of(e)
+                break
+            except transient as e:
+                result['error'] = str(e)
+                if attempt < retries:
+                    instrumentation.log(f"🔁 Conexão interrompida, retomando {filename} ({attempt + 1}/{retries})")
+            except Exception as e:
+                result['error'] = str(e)
+                break
+        record['bytes'] = result['bytes']
+        record['status'] = result['status']
+
+    if not result['ok']:
+        instrumentation.log(f"❌ Erro ao baixar {filename}: {result['error']}", file=filename, error=result['error'])
 
+    return result
 
 
 # download_archive('kpdx_zse', 'Oct-01-2021', '0000Z')
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 from cli import get_args
-from liveatc import get_stations, download_archive
+import instrumentation
+from manifest import ARCHIVE_NAME, Manifest, NEGATIVE_TTL
+import glob
+import os
+import sys
 from datetime import datetime, timedelta
 
 
@@ -14,40 +18,311 @@ def zulu_range(start_str, end_str, step_min=30):
     start += timedelta(minutes=step_min)
 
 
+def retention_dates(days=30):
+  today = datetime.utcnow()
+  return [(today - timedelta(days=n)).strftime('%b-%d-%Y') for n in range(days - 1, -1, -1)]
+
+
+def probe_jobs(manifest, jobs, workers=8, max_per_host=4, ttl=NEGATIVE_TTL):
+  """Split jobs into (available, absent); cached 404s younger than `ttl` are not probed again."""
+  from downloader import probe_many
+
+  to_probe, cached_absent = [], []
+  for job in jobs:
+    (cached_absent if manifest.known_absent(job[0], job[1], job[2], ttl) else to_probe).append(job)
+
+  availability = probe_many(to_probe, workers=workers, max_per_host=max_per_host)
+  for (station, date, slot, _, _), exists in availability.items():
+    if exists is False:
+      manifest.record_absent(station, date, slot)
+
+  # Unknown answers (timeouts, 5xx) stay schedulable; the download reports the real error.
+  available = [job for job in to_probe if availability.get(job) is not False]
+  absent = cached_absent + [job for job in to_probe if availability.get(job) is False]
+  return available, absent
+
+
+def verify_adopted(manifest, jobs, workers=8, max_per_host=4, base_url=None):
+  """Compare archives adopted by `Manifest.scan` with the server's size; returns the jobs found complete.
+
+  A truncated file becomes the `.part` of its job, so the download resumes it; a file larger
+  than the remote one is discarded. Files the server cannot size stay unverified and are fetched again.
+  """
+  from downloader import remote_sizes
+
+  adopted = [job for job in jobs if manifest.status(job[0], job[1], job[2]) == 'unverified']
+  if not adopted:
+    return set()
+
+  complete, truncated = set(), 0
+  for job, size in remote_sizes(adopted, workers=workers, max_per_host=max_per_host,
+                                        base_url=base_url).items():
+    station, date, slot, _, _ = job
+    entry = manifest.get(station, date, slot)
+    if size is None:
+      continue
+    if entry['size'] == size:
+      manifest.mark_verified(station, date, slot)
+      complete.add(job)
+      continue
+    if entry['size'] < size:
+      os.replace(entry['path'], entry['path'] + '.part')
+      truncated += 1
+    else:
+      os.remove(entry['path'])
+    manifest.forget(station, date, slot)
+
+  print(f"🔎 {len(adopted)} arquivos já existentes conferidos no servidor: {len(complete)} completos, "
+        f"{truncated} incompletos (serão retomados)")
+  return complete
+
+
+# Each command imports what it needs, so `--help`, `stations` and cron `download` runs start fast.
 def stations(args):
-  stations = get_stations(args.icao)
-  for station in stations:
-    print(f"[{station['identifier']}] - {station['title']}")
-    for freq in station['frequencies']:
-      print(f"\t{freq['title']} - {freq['frequency']}")
-    print()
+  from liveatc import get_stations_many
+
+  results = get_stations_many(args.icao, workers=args.workers, ttl=args.ttl * 3600, refresh=args.refresh)
+  for icao, stations in results.items():
+    if len(results) > 1:
+      print(f"== {icao.upper()} ==")
+    if isinstance(stations, Exception):
+      print(f"❌ Erro ao buscar estações de {icao}: {stations}")
+      print()
+      continue
+    for station in stations:
+      print(f"[{station['identifier']}] - {station['title']}")
+      for freq in station['frequencies']:
+        print(f"\t{freq['title']} - {freq['frequency']}")
+      print()
 
 
 def download(args):
+  from liveatc import download_archive
+
   date_now = datetime.utcnow()
   last_period = date_now - timedelta(minutes=30) - (date_now - datetime.min) % timedelta(minutes=30)
 
   date = args.date if args.date else last_period.strftime('%b-%d-%Y')
   time = args.time if args.time else last_period.strftime('%H%MZ')
 
-  download_archive(args.station, date, time, args.folder, args.prefix)
+  folder = args.folder or args.station.split('_')[0]
+  download_archive(args.station, date, time, folder, args.prefix)
 
 
-def download_multi(args):
-  for feed in args.feeds:
+def parse_feeds(feeds):
+  for feed in feeds:
     try:
       station, prefix, folder = feed.split(',')
     except ValueError:
       print(f"❌ Feed inválido: {feed}. Use o formato: station,prefix,folder")
       continue
+    yield station, prefix, folder
+
+
+def download_multi(args):
+  from downloader import download_many, print_summary
+
+  jobs = []
+  skipped = 0
+  with Manifest() as manifest:
+    manifest.scan()
+    for station, prefix, folder in parse_feeds(args.feeds):
+      for time in zulu_range(args.start, args.end):
+        if not args.force and manifest.is_complete(station, args.date, time, verify=args.verify):
+          skipped += 1
+          continue
+        jobs.append((station, args.date, time, folder, prefix))
+
+    if not args.force:
+      complete = verify_adopted(manifest, jobs, workers=args.workers, max_per_host=args.max_per_host)
+      jobs = [job for job in jobs if job not in complete]
+      skipped += len(complete)
+
+    if args.probe:
+      jobs, absent = probe_jobs(manifest, jobs, workers=args.workers, max_per_host=args.max_per_host,
+                                ttl=args.ttl * 3600)
+      print(f"🔎 {len(jobs)} horários disponíveis, {len(absent)} inexistentes no servidor")
+    else:
+      # Slots that answered 404 recently are not requested again, with or without probing.
+      absent = {job for job in jobs if manifest.known_absent(job[0], job[1], job[2], args.ttl * 3600)}
+      jobs = [job for job in jobs if job not in absent]
+      if absent:
+        print(f"🔎 {len(absent)} horários pulados: 404 recente em cache (--ttl)")
+
+    summary = download_many(jobs, workers=args.workers, max_per_host=args.max_per_host,
+                            on_result=manifest.record_result)
+  summary['skipped'] = skipped
+  print_summary(summary)
+
+
+def probe(args):
+  dates = [args.date] if args.date else retention_dates(args.days)
+  slots = list(zulu_range(args.start, args.end))
+  feeds = list(parse_feeds(args.feeds))
+  jobs = [(station, date, time, folder, prefix)
+          for station, prefix, folder in feeds
+          for date in dates
+          for time in slots]
+
+  with Manifest() as manifest:
+    available, _ = probe_jobs(manifest, jobs, workers=args.workers, max_per_host=args.max_per_host,
+                              ttl=args.ttl * 3600)
+
+  available = {job[:3] for job in available}
+  for station, _, _ in feeds:
+    for date in dates:
+      absent = [time for time in slots if (station, date, time) not in available]
+      print(f"[{station}] {date}: {len(slots) - len(absent)}/{len(slots)} disponíveis")
+      if absent and len(absent) < len(slots):
+        print(f"\tIndisponíveis: {' '.join(absent)}")
+
 
-    for time in zulu_range(args.start, args.end):
-      download_archive(station, args.date, time, folder, prefix)
+def missing(args):
+  with Manifest() as manifest:
+    manifest.scan()
+    if args.feeds:
+      stations = [station for station, _, _ in parse_feeds(args.feeds)]
+    else:
+      stations = sorted({e['station'] for e in manifest.entries(folder=args.icao.lower())})
+
+    slots = list(zulu_range(args.start, args.end))
+    for station in stations:
+      absent = manifest.missing(station, args.date, slots)
+      print(f"[{station}] {args.date}: {len(slots) - len(absent)}/{len(slots)} presentes")
+      if absent:
+        print(f"\tFaltando: {' '.join(absent)}")
+
+
+def process(args):
+  # Audio dependencies are heavy; only the processing command needs them.
+  from audioProcess.batch import discoverArchives, isUpToDate, outputPathFor, runBatch
+
+  options = {'filter_type': args.filter, 'streaming': args.streaming, 'pcm_cache': args.pcm_cache,
+             'output_format': args.format}
+  jobs = []
+  skipped = 0
+  for mp3_path in args.files or discoverArchives(args.root, args.folder, args.station):
+    output_path = outputPathFor(mp3_path, args.suffix, args.output_dir, args.format, args.filter)
+    if not args.force and isUpToDate(mp3_path, output_path, options):
+      skipped += 1
+      continue
+    jobs.append((mp3_path, output_path))
+
+  print(f"🎧 {len(jobs)} arquivos para processar, {skipped} já atualizados")
+
+  with Manifest() as manifest:
+    def on_result(result):
+      match = ARCHIVE_NAME.match(os.path.basename(result['input']))
+      if match:
+        station = os.path.basename(os.path.dirname(result['input']))
+        manifest.set_decode_status(station, match['date'], match['slot'], 'ok' if result['ok'] else 'error')
+      if result['ok']:
+        print(f"✅ {result['output']} ({result['segments']} segmentos, {result['seconds']:.1f} s)")
+      else:
+        print(f"❌ {result['input']}: {result['error']}")
+
+    results = runBatch(jobs, workers=args.workers, options=options, on_result=on_result)
+
+  failed = sum(not r['ok'] for r in results)
+  print()
+  print(f"📊 Resumo: {len(results) - failed}/{len(results)} processados, {failed} falhas, {skipped} já atualizados")
+
+
+def split(args):
+  from audioProcess.batch import discoverArchives
+  from audioProcess.splitter import splitArchives
+
+  mp3_paths = discoverArchives(args.root, args.folder, args.station)
+  index_path = args.index or os.path.join(args.root, 'clips_index.csv')
+
+  def output_dir_for(mp3_path):
+    return args.output_dir or os.path.join(os.path.dirname(mp3_path), 'clips')
+
+  total, skipped = splitArchives(mp3_paths, output_dir_for, index_path, workers=args.workers,
+                                 padding_ms=args.padding_ms, noise_reduce=not args.no_noise_reduce,
+                                 keep_original=args.keep_original)
+  print()
+  print(f"📊 Resumo: {total} clipes de {len(mp3_paths)} arquivos ({skipped} já atualizados), índice em {index_path}")
+
+
+def metrics(args):
+  from audioProcess.batch import discoverArchives
+  from audioProcess.evaluation import parseGrid, runEvaluation, summaryPathFor
+
+  mp3_paths = discoverArchives(args.root, args.folder, args.station)[:args.limit]
+  param_sets = parseGrid(args.grid)
+  output = args.output or os.path.join(args.root, 'metrics.csv')
+  print(f"📐 {len(mp3_paths)} arquivos × {len(param_sets)} conjuntos de parâmetros")
+
+  broken = []
+
+  def on_rows(rows):
+    failed = [row for row in rows if row['error']]
+    broken.extend(row for row in failed if row['error'].startswith('BrokenProcessPool'))
+    print(f"{'❌' if failed else '✅'} {rows[0]['file']} ({sum(row['seconds'] or 0 for row in rows):.1f} s)"
+          + (f": {failed[0]['error']}" if failed else ''))
+
+  summary = runEvaluation(mp3_paths, param_sets, output, workers=args.workers, use_pcm_cache=args.pcm_cache,
+                          on_rows=on_rows)
+  if broken:
+    print("💡 Um processo encerrado abruptamente (BrokenProcessPool) costuma ser falta de memória: "
+          "cada worker usa até ~3,5 GB por arquivo de 30 min; tente um --workers menor")
+
+  shown = ['snrDelta', 'nsReductionDb', 'speechLevelDeltaDb', 'lsdMeanDb', 'mfccMean']
+  print()
+  print(f"📊 Média por conjunto de parâmetros ({summaryPathFor(output)} tem também por estação):")
+  print('\t' + f"{'parâmetros':<40}{'arquivos':>9}" + ''.join(f"{key:>20}" for key in shown))
+  for row in summary:
+    if row['station'] == '*':
+      print('\t' + f"{row['params']:<40}{row['files']:>9}" +
+            ''.join(f"{row[key + '_mean']:>20.2f}" if row[key + '_mean'] is not None else f"{'-':>20}" for key in shown))
+
+
+def timeline(args):
+  from audioProcess.timeline import assembleTimeline, indexPathFor
+
+  station_dir = os.path.join(args.root, args.folder, args.station)
+  sources = []
+  for time in zulu_range(args.start, args.end):
+    matches = sorted(glob.glob(os.path.join(station_dir, f"*-{args.date}-{time}.mp3")))
+    sources.append((f"{args.date} {time}", matches[0] if matches else None))
+  absent = [label for label, path in sources if path is None]
+  if not sources or len(absent) == len(sources):
+    reason = "nenhum horário no intervalo" if not sources else "nenhum MP3 encontrado em " + station_dir
+    print(f"❌ Linha do tempo vazia para {args.station} em {args.date} de {args.start} a {args.end}: {reason}")
+    sys.exit(1)
+  print(f"🧵 {len(sources) - len(absent)}/{len(sources)} horários encontrados; os ausentes viram silêncio")
+
+  output = args.output or os.path.join(station_dir, f"{args.station}-{args.date}-timeline" +
+                                       ('.npy' if args.format == 'memmap' else ''))
+  index = assembleTimeline(sources, output, args.format, filter_type=args.filter)
+  print(f"📊 Resumo: {len(index['segments'])} segmentos de fala em {index['sources'][-1]['end'] / 3600:.1f} h, "
+        f"índice em {indexPathFor(output, args.format)}")
+
+
+def follow(args):
+  from follower import Follower
+
+  options = {'filter_type': args.filter, 'streaming': args.streaming} if args.process else None
+  with Manifest() as manifest:
+    manifest.scan()
+    follower = Follower(list(parse_feeds(args.feeds)), manifest, delay=args.delay * 60, backoff=args.backoff * 60,
+                        max_backoff=args.max_backoff * 60, give_up=args.give_up * 3600, workers=args.workers,
+                        max_per_host=args.max_per_host, process_options=options, process_workers=args.process_workers,
+                        queue_size=args.queue_size, suffix=args.suffix, output_dir=args.output_dir)
+    stats = follower.run()
+
+  print()
+  print(f"📊 Resumo: {stats['downloaded']} baixados em {stats['requests']} requisições, {stats['processed']} processados, "
+        f"{stats['gave_up']} desistências")
 
 
 if __name__ == '__main__':
   args = get_args()
-  print(args)
+  if args.profile:
+    instrumentation.enable(args.profile)
+  if instrumentation.enabled():
+    instrumentation.emit({'event': 'args', 'args': vars(args)})
 
   if args.command == 'stations':
     stations(args)
@@ -55,5 +330,22 @@ if __name__ == '__main__':
     download(args)
   elif args.command == 'download-multi':
     download_multi(args)
+  elif args.command == 'probe':
+    probe(args)
+  elif args.command == 'missing':
+    missing(args)
+  elif args.command == 'process':
+    process(args)
+  elif args.command == 'split':
+    split(args)
+  elif args.command == 'metrics':
+    metrics(args)
+  elif args.command == 'timeline':
+    timeline(args)
+  elif args.command == 'follow':
+    follow(args)
   else:
     print("❌ Comando inválido. Use --help para ver as opções.")
+
+  if instrumentation.enabled():
+    instrumentation.print_summary()
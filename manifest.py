@@ -0,0 +1,172 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+
+MANIFEST_PATH = os.path.join('downloads', 'manifest.sqlite3')
+ARCHIVE_NAME = re.compile(r'^(?P<prefix>.+)-(?P<date>[A-Za-z]{3}-\d{2}-\d{4})-(?P<slot>\d{4}Z)\.mp3$')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS archives (
+  station TEXT NOT NULL,
+  date TEXT NOT NULL,
+  slot TEXT NOT NULL,
+  folder TEXT NOT NULL,
+  prefix TEXT NOT NULL,
+  path TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  sha256 TEXT,
+  etag TEXT,
+  last_modified TEXT,
+  decode_status TEXT NOT NULL DEFAULT 'pending',
+  verified INTEGER NOT NULL DEFAULT 1,
+  updated_at REAL NOT NULL,
+  PRIMARY KEY (station, date, slot)
+);
+CREATE TABLE IF NOT EXISTS probes (
+  station TEXT NOT NULL,
+  date TEXT NOT NULL,
+  slot TEXT NOT NULL,
+  checked_at REAL NOT NULL,
+  PRIMARY KEY (station, date, slot)
+);
+'''
+NEGATIVE_TTL = 6 * 3600
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+  digest = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+class Manifest:
+  """Local index of the downloads tree keyed by (station, date, Zulu slot)."""
+
+  def __init__(self, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    self.path = path
+    self.db = sqlite3.connect(path)
+    self.db.row_factory = sqlite3.Row
+    self.db.executescript(SCHEMA)
+    columns = {row['name'] for row in self.db.execute('PRAGMA table_info(archives)')}
+    if 'verified' not in columns:
+      # Older manifests: entries without any server metadata were adopted by `scan`, not downloaded.
+      self.db.execute('ALTER TABLE archives ADD COLUMN verified INTEGER NOT NULL DEFAULT 1')
+      self.db.execute('UPDATE archives SET verified = 0 WHERE etag IS NULL AND last_modified IS NULL')
+    self.db.commit()
+
+  def close(self):
+    self.db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def get(self, station, date, slot):
+    row = self.db.execute('SELECT * FROM archives WHERE station = ? AND date = ? AND slot = ?',
+                          (station, date, slot)).fetchone()
+    return dict(row) if row else None
+
+  def entries(self, station=None, date=None, folder=None):
+    query, params = 'SELECT * FROM archives WHERE 1 = 1', []
+    for column, value in (('station', station), ('date', date), ('folder', folder)):
+      if value is not None:
+        query += f' AND {column} = ?'
+        params.append(value)
+    return [dict(row) for row in self.db.execute(query + ' ORDER BY station, date, slot', params)]
+
+  def record(self, station, date, slot, folder, prefix, path, etag=None, last_modified=None, verified=True):
+    self.db.execute(
+      'INSERT OR REPLACE INTO archives (station, date, slot, folder, prefix, path, size, sha256, etag, '
+      'last_modified, decode_status, verified, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+      (station, date, slot, folder, prefix, path, os.path.getsize(path), file_sha256(path),
+       etag, last_modified, 'pending', int(verified), time.time()))
+    self.db.execute('DELETE FROM probes WHERE station = ? AND date = ? AND slot = ?', (station, date, slot))
+    self.db.commit()
+
+  def record_result(self, result):
+    """Record a `liveatc.download_archive` result; 404s go to the negative cache."""
+    if result['ok']:
+      self.record(result['station'], result['date'], result['time'], result['folder'], result['prefix'],
+                  result['path'], result['etag'], result['last_modified'])
+    elif result.get('status') in (404, 410):
+      self.record_absent(result['station'], result['date'], result['time'])
+
+  def record_absent(self, station, date, slot):
+    self.db.execute('INSERT OR REPLACE INTO probes (station, date, slot, checked_at) VALUES (?, ?, ?, ?)',
+                    (station, date, slot, time.time()))
+    self.db.commit()
+
+  def known_absent(self, station, date, slot, ttl=NEGATIVE_TTL):
+    """True while a 404 for this slot is younger than `ttl` seconds."""
+    row = self.db.execute('SELECT checked_at FROM probes WHERE station = ? AND date = ? AND slot = ?',
+                          (station, date, slot)).fetchone()
+    return row is not None and time.time() - row['checked_at'] < ttl
+
+  def mark_verified(self, station, date, slot):
+    self.db.execute('UPDATE archives SET verified = 1, updated_at = ? WHERE station = ? AND date = ? AND slot = ?',
+                    (time.time(), station, date, slot))
+    self.db.commit()
+
+  def forget(self, station, date, slot):
+    self.db.execute('DELETE FROM archives WHERE station = ? AND date = ? AND slot = ?', (station, date, slot))
+    self.db.commit()
+
+  def set_decode_status(self, station, date, slot, status):
+    self.db.execute('UPDATE archives SET decode_status = ?, updated_at = ? WHERE station = ? AND date = ? AND slot = ?',
+                    (status, time.time(), station, date, slot))
+    self.db.commit()
+
+  def status(self, station, date, slot, verify=False):
+    """'missing', 'complete', 'unverified' (adopted by `scan`, size not yet checked against the server)
+    or 'stale' (file gone, truncated or, with `verify`, hash mismatch)."""
+    entry = self.get(station, date, slot)
+    if entry is None:
+      return 'missing'
+    if not os.path.exists(entry['path']) or os.path.getsize(entry['path']) != entry['size']:
+      return 'stale'
+    if verify and entry['sha256'] and file_sha256(entry['path']) != entry['sha256']:
+      return 'stale'
+    return 'complete' if entry['verified'] else 'unverified'
+
+  def is_complete(self, station, date, slot, verify=False):
+    return self.status(station, date, slot, verify) == 'complete'
+
+  def missing(self, station, date, slots):
+    """Slots with no usable file on disk; unverified files count as present."""
+    return [slot for slot in slots if self.status(station, date, slot) not in ('complete', 'unverified')]
+
+  def scan(self, root='downloads'):
+    """Index archives already on disk under `root/<folder>/<station>/` that the manifest does not know yet.
+
+    Files written before downloads went through `.part` files may be truncated, so they are recorded
+    as unverified until their size has been compared with the server's (see main.verify_adopted).
+    """
+    added = 0
+    if not os.path.isdir(root):
+      return added
+
+    for folder in sorted(os.listdir(root)):
+      folder_dir = os.path.join(root, folder)
+      if not os.path.isdir(folder_dir):
+        continue
+      for station in sorted(os.listdir(folder_dir)):
+        station_dir = os.path.join(folder_dir, station)
+        if not os.path.isdir(station_dir):
+          continue
+        for filename in sorted(os.listdir(station_dir)):
+          match = ARCHIVE_NAME.match(filename)
+          if not match or self.get(station, match['date'], match['slot']):
+            continue
+          self.record(station, match['date'], match['slot'], folder, match['prefix'],
+                      os.path.join(station_dir, filename), verified=False)
+          added += 1
+
+    return added
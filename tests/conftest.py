@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.archive_server import ArchiveServer  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+  """Run in an empty directory: downloads and the manifest live under ./downloads."""
+  monkeypatch.chdir(tmp_path)
+  return tmp_path
+
+
+@pytest.fixture
+def server():
+  with ArchiveServer(size=64 * 1024) as server:
+    yield server
@@ -0,0 +1,40 @@
+import os
+
+from audioProcess.batch import isUpToDate, optionsPathFor, outputPathFor, processFile
+
+ARCHIVE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'downloads', 'sbrf', 'sbrf_11835',
+                       'SBRF-Twr-Jul-10-2025-0000Z.mp3')
+
+
+def test_output_name_follows_the_filter(tmp_path):
+  assert outputPathFor(ARCHIVE, output_dir=str(tmp_path)).endswith('SBRF-Twr-Jul-10-2025-0000Z_fir.wav')
+  assert outputPathFor(ARCHIVE, output_dir=str(tmp_path), filter_type='iir').endswith('0000Z_iir.wav')
+  assert outputPathFor(ARCHIVE, '_x', str(tmp_path), 'opus', 'iir').endswith('0000Z_x.opus')
+
+
+def test_outputs_are_stale_when_options_change(tmp_path):
+  options = {'filter_type': 'iir', 'streaming': True}
+  output_path = outputPathFor(ARCHIVE, output_dir=str(tmp_path), filter_type='iir')
+  assert not isUpToDate(ARCHIVE, output_path, options)
+
+  result = processFile(ARCHIVE, output_path, options)
+  assert result['ok'], result['error']
+  assert os.path.exists(optionsPathFor(output_path))
+  assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in (output_path, optionsPathFor(output_path)))
+
+  assert isUpToDate(ARCHIVE, output_path, options)
+  # How the output is computed does not matter, what it contains does.
+  assert isUpToDate(ARCHIVE, output_path, {'filter_type': 'iir', 'streaming': False, 'pcm_cache': True})
+  assert not isUpToDate(ARCHIVE, output_path, {'filter_type': 'iir', 'streaming': True, 'mode': 2})
+  assert not isUpToDate(ARCHIVE, output_path, {'filter_type': 'fir', 'streaming': True})
+
+  os.remove(optionsPathFor(output_path))
+  assert not isUpToDate(ARCHIVE, output_path, options)
+
+
+def test_log_names_the_final_output_not_the_temporary_file(tmp_path, capsys):
+  for streaming in (True, False):
+    output_path = str(tmp_path / f"streaming_{streaming}.wav")
+    assert processFile(ARCHIVE, output_path, {'filter_type': 'iir', 'streaming': streaming})['ok']
+    written = [line for line in capsys.readouterr().out.splitlines() if 'written to' in line]
+    assert written == [f"Filtered audio written to {output_path}"]
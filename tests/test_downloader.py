@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.archive_server import ArchiveServer
+from downloader import download_many
+from liveatc import download_archive, make_session
+from manifest import Manifest
+
+
+def archive_path(station, filename, folder='sim'):
+  return os.path.join('downloads', folder, station, filename)
+
+
+def read(path):
+  with open(path, 'rb') as f:
+    return f.read()
+
+
+def test_download_many_writes_files_results_and_manifest(workdir):
+  # With missing_rate=0.5 some of these slots are 404s; which ones is deterministic.
+  with ArchiveServer(size=32 * 1024, missing_rate=0.5) as server:
+    jobs = [('sim_1', 'Jul-10-2025', f"{hour:02d}00Z", 'sim', 'SIM-1') for hour in range(8)]
+    exists = {job: server.exists(job[0], f"SIM-1-{job[1]}-{job[2]}.mp3") for job in jobs}
+    assert any(exists.values()) and not all(exists.values())
+
+    results = []
+    with Manifest() as manifest:
+      summary = download_many(jobs, workers=3, base_url=server.url,
+                              on_result=lambda r: (manifest.record_result(r), results.append(r)))
+
+      assert summary['total'] == len(jobs)
+      assert summary['ok'] == sum(exists.values())
+      assert summary['failed'] == len(jobs) - summary['ok']
+      assert summary['bytes'] == summary['ok'] * server.size
+      assert len(results) == len(jobs)
+
+      for result in results:
+        job = (result['station'], result['date'], result['time'], result['folder'], result['prefix'])
+        filename = f"SIM-1-{result['date']}-{result['time']}.mp3"
+        assert result['filename'] == filename
+        assert result['path'] == archive_path('sim_1', filename)
+        assert not os.path.exists(result['path'] + '.part')
+        entry = manifest.get('sim_1', result['date'], result['time'])
+        if exists[job]:
+          assert result['ok'] and result['status'] == 200 and result['error'] is None
+          assert result['bytes'] == server.size and result['etag']
+          assert read(result['path']) == server.content('sim_1', filename)
+          assert entry['size'] == server.size and entry['etag'] == result['etag']
+          assert entry['decode_status'] == 'pending'
+          assert manifest.is_complete('sim_1', result['date'], result['time'], verify=True)
+          assert not manifest.known_absent('sim_1', result['date'], result['time'])
+        else:
+          assert not result['ok'] and result['status'] == 404 and result['bytes'] == 0
+          assert not os.path.exists(result['path'])
+          assert entry is None
+          assert manifest.known_absent('sim_1', result['date'], result['time'])
+          assert not manifest.known_absent('sim_1', result['date'], result['time'], ttl=0)
+
+    assert server.statuses == {200: summary['ok'], 404: summary['failed']}
+
+
+def resume(server, partial_bytes, session=None):
+  filename = 'SIM-1-Jul-10-2025-0000Z.mp3'
+  content = server.content('sim_1', filename)
+  path = archive_path('sim_1', filename)
+  os.makedirs(os.path.dirname(path))
+  with open(path + '.part', 'wb') as f:
+    f.write(content[:partial_bytes])
+
+  result = download_archive('sim_1', 'Jul-10-2025', '0000Z', 'sim', 'SIM-1', session=session, base_url=server.url)
+  assert read(path) == content
+  assert not os.path.exists(path + '.part')
+  return result
+
+
+@pytest.mark.parametrize('with_session', [True, False], ids=['requests', 'urllib'])
+def test_resume_partial_download_with_range(workdir, server, with_session):
+  session = make_session() if with_session else None
+  try:
+    result = resume(server, 10000, session)
+  finally:
+    if session:
+      session.close()
+
+  assert result['ok'] and result['status'] == 200
+  assert result['bytes'] == server.size - 10000
+  assert server.statuses == {206: 1}
+
+
+def test_complete_part_file_is_finished_on_416(workdir, server):
+  result = resume(server, server.size)
+
+  assert result['ok'] and result['bytes'] == 0
+  assert server.statuses == {416: 1}
+
+
+def test_server_without_range_support_starts_over(workdir):
+  with ArchiveServer(size=16 * 1024, ranges=False) as server:
+    result = resume(server, 5000)
+
+    assert result['ok'] and result['bytes'] == server.size
+    assert server.statuses == {200: 1}
+    assert server.requests['GET'] == 1
+
+
+def test_missing_archive_leaves_no_file(workdir, server):
+  server.available = lambda station, filename: False
+  result = download_archive('sim_1', 'Jul-10-2025', '0000Z', 'sim', 'SIM-1', base_url=server.url)
+
+  assert not result['ok'] and result['status'] == 404
+  assert '404' in result['error']
+  assert not os.listdir(os.path.join('downloads', 'sim', 'sim_1'))
+
+
+def test_download_multi_skips_cached_404s_without_probe(workdir, monkeypatch):
+  import liveatc
+  from cli import parser
+  from main import download_multi
+
+  with ArchiveServer(size=8 * 1024, missing_rate=0.5) as server:
+    monkeypatch.setattr(liveatc, 'ARCHIVE_URL', server.url)
+    args = parser.parse_args(['download-multi', '--icao', 'SIM', '--date', 'Jul-10-2025', '--start', '0000Z',
+                              '--end', '0330Z', '--feeds', 'sim_1,SIM-1,sim'])
+    download_multi(args)
+    first = dict(server.statuses)
+    assert first.get(404) and first.get(200)
+
+    server.statuses.clear()
+    download_multi(args)
+    assert server.statuses == {}
+
+    with Manifest() as manifest:
+      assert len(manifest.entries(station='sim_1')) == first[200]
+
+
+def test_single_download_does_not_import_requests(workdir, server):
+  code = ("import sys, liveatc; "
+          f"r = liveatc.download_archive('sim_1', 'Jul-10-2025', '0000Z', 'sim', 'SIM-1', base_url={server.url!r}); "
+          "assert r['ok'], r; assert 'requests' not in sys.modules")
+  subprocess.run([sys.executable, '-c', code], check=True, cwd=os.getcwd(),
+                 env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,40 @@
+import csv
+import os
+
+from audioProcess import evaluation
+from audioProcess.evaluation import parseGrid, runEvaluation, summaryPathFor
+
+
+def fake_evaluate(mp3_path, param_sets, use_pcm_cache=False):
+  # Runs in the (forked) worker: the "crash" archive takes the whole process down, as the OOM killer does.
+  if 'crash' in mp3_path:
+    os._exit(9)
+  return [{'file': mp3_path, 'station': 'sim', **{k: params[k] for k in ['params'] + evaluation.PARAM_KEYS},
+           'snrDelta': 1.0, 'seconds': 0.1, 'error': None} for params in param_sets]
+
+
+def read_rows(path):
+  with open(path, newline='') as f:
+    return list(csv.DictReader(f))
+
+
+def test_dead_worker_gives_error_rows_and_a_summary(tmp_path, monkeypatch):
+  monkeypatch.setattr(evaluation, 'evaluateFile', fake_evaluate)
+  param_sets = parseGrid(['mode=2,3'])
+  paths = [f"/data/sim/{name}.mp3" for name in ('a', 'crash', 'b', 'c')]
+  output = str(tmp_path / 'metrics.csv')
+  seen = []
+
+  summary = runEvaluation(paths, param_sets, output, workers=1, on_rows=seen.extend)
+
+  rows = read_rows(output)
+  assert len(rows) == len(seen) == len(paths) * len(param_sets)
+  assert {row['file'] for row in rows} == set(paths)
+  crashed = [row for row in rows if row['file'].endswith('crash.mp3')]
+  assert crashed and all(row['error'].startswith('BrokenProcessPool') for row in crashed)
+
+  assert os.path.exists(summaryPathFor(output))
+  total = {row['params']: row for row in summary if row['station'] == '*'}
+  assert set(total) == {'mode=2', 'mode=3'}
+  assert all(row['files'] == len(paths) and row['errors'] >= 1 for row in total.values())
+  assert len(read_rows(summaryPathFor(output))) == len(summary)
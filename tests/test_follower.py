@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import follower
+from benchmarks.archive_server import ArchiveServer
+from follower import SLOT, Follower, SimulatedClock, slot_job
+from manifest import ARCHIVE_NAME, Manifest
+
+START = datetime(2025, 7, 10)
+FEED = ('sim_1', 'SIM-1', 'sim')
+
+
+def slot_of(filename):
+  match = ARCHIVE_NAME.match(filename)
+  return datetime.strptime(f"{match['date']} {match['slot']}", '%b-%d-%Y %H%MZ')
+
+
+@pytest.fixture
+def follow(workdir, monkeypatch):
+  """Run a Follower over simulated time; `lags` maps a slot to the minutes after its end when it appears."""
+  sessions = []
+
+  def make_session(*args, **kwargs):
+    sessions.append(real_make_session(*args, **kwargs))
+    return sessions[-1]
+
+  real_make_session = follower.make_session
+  monkeypatch.setattr(follower, 'make_session', make_session)
+
+  def run(lags, hours, manifest=None, **kwargs):
+    clock = SimulatedClock(START)
+
+    def available(station, filename):
+      slot = slot_of(filename)
+      return lags.get(slot) is not None and clock.now() >= slot + SLOT + timedelta(minutes=lags[slot])
+
+    requested = []
+    with ArchiveServer(size=4096, available=lambda s, f: requested.append((clock.now(), f)) or available(s, f)) as server:
+      with manifest or Manifest() as manifest:
+        instance = Follower([FEED], manifest, clock=clock, base_url=server.url, **kwargs)
+        stats = instance.run(since=START, until=START + timedelta(hours=hours))
+        statuses = dict(server.statuses)
+    return stats, requested, statuses, sessions
+
+  return run
+
+
+def test_retries_with_backoff_until_published(follow):
+  # First try 2 min after the slot ends, then 1, 2, 4... min apart: 404 at +2 and +3, found at +5.
+  stats, requested, statuses, sessions = follow({START: 5}, hours=1, delay=120, backoff=60)
+
+  end = START + SLOT
+  assert [when for when, _ in requested] == [end + timedelta(minutes=m) for m in (2, 3, 5)]
+  assert statuses == {404: 2, 200: 1}
+  assert stats['requests'] == 3 and stats['downloaded'] == 1 and stats['gave_up'] == 0
+  assert stats['download_latency'] == [5 * 60]
+  assert len(sessions) == 1
+
+
+def test_backoff_is_capped_and_gives_up(follow):
+  stats, requested, _, _ = follow({}, hours=1, delay=120, backoff=60, max_backoff=240, give_up=20 * 60)
+
+  end = START + SLOT
+  # 2, 3, 5, 9 (capped at 4 min from here), 13, 17; the next try would be at 21 > 20 minutes.
+  assert [when for when, _ in requested] == [end + timedelta(minutes=m) for m in (2, 3, 5, 9, 13, 17)]
+  assert stats['requests'] == 6 and stats['gave_up'] == 1 and stats['downloaded'] == 0
+
+
+def test_follows_consecutive_slots_and_skips_complete_ones(follow, workdir):
+  lags = {START + n * SLOT: 0 for n in range(4)}
+  with Manifest() as manifest:
+    # Slot 1 is already downloaded: it must never be requested.
+    station, date, time, folder, prefix = slot_job(FEED, START + SLOT)
+    path = workdir / 'downloads' / folder / station / f"{prefix}-{date}-{time}.mp3"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b'x' * 4096)
+    manifest.record(station, date, time, folder, prefix, str(path))
+
+    stats, requested, statuses, sessions = follow(lags, hours=2.5, manifest=manifest, delay=120)
+
+  filenames = [filename for _, filename in requested]
+  assert filenames == [f"SIM-1-Jul-10-2025-{slot}.mp3" for slot in ('0000Z', '0100Z', '0130Z')]
+  assert statuses == {200: 3}
+  assert stats['requests'] == 3 and stats['downloaded'] == 3
+  assert stats['download_latency'] == [120] * 3
+  assert len(sessions) == 1
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+
+from downloader import download_many
+from main import verify_adopted
+from manifest import MANIFEST_PATH, Manifest
+
+
+def write_archive(server, slot, length=None, folder='sim', station='sim_1', prefix='SIM-1'):
+  filename = f"{prefix}-Jul-10-2025-{slot}.mp3"
+  content = server.content(station, filename)
+  path = os.path.join('downloads', folder, station, filename)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'wb') as f:
+    f.write(content if length is None else (content * 2)[:length])
+  return (station, 'Jul-10-2025', slot, folder, prefix), path, content
+
+
+def test_scanned_archives_are_checked_against_the_server(workdir, server):
+  whole, whole_path, _ = write_archive(server, '0000Z')
+  truncated, truncated_path, content = write_archive(server, '0030Z', length=1000)
+  oversized, oversized_path, _ = write_archive(server, '0100Z', length=server.size + 10)
+  jobs = [whole, truncated, oversized]
+
+  with Manifest() as manifest:
+    assert manifest.scan() == 3
+    assert [manifest.status(*job[:3]) for job in jobs] == ['unverified'] * 3
+    assert manifest.missing('sim_1', 'Jul-10-2025', ['0000Z', '0030Z', '0100Z', '0130Z']) == ['0130Z']
+
+    complete = verify_adopted(manifest, jobs, workers=2, base_url=server.url)
+    assert complete == {whole}
+    assert manifest.status(*whole[:3]) == 'complete'
+    assert manifest.get(*truncated[:3]) is None and manifest.get(*oversized[:3]) is None
+    assert os.path.getsize(truncated_path + '.part') == 1000
+    assert not os.path.exists(oversized_path)
+
+    download_many([truncated, oversized], base_url=server.url, on_result=manifest.record_result)
+    assert all(manifest.status(*job[:3]) == 'complete' for job in jobs)
+
+  with open(truncated_path, 'rb') as f:
+    assert f.read() == content
+  assert server.statuses == {200: 3 + 1, 206: 1}
+
+
+def test_old_manifests_mark_scanned_entries_unverified(workdir, server):
+  _, path, _ = write_archive(server, '0000Z')
+  os.makedirs('downloads', exist_ok=True)
+  db = sqlite3.connect(MANIFEST_PATH)
+  db.execute('CREATE TABLE archives (station TEXT NOT NULL, date TEXT NOT NULL, slot TEXT NOT NULL, folder TEXT NOT NULL, '
+             'prefix TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, sha256 TEXT, etag TEXT, last_modified TEXT, '
+             "decode_status TEXT NOT NULL DEFAULT 'pending', updated_at REAL NOT NULL, PRIMARY KEY (station, date, slot))")
+  for slot, etag in (('0000Z', None), ('0030Z', '"abc"')):
+    db.execute('INSERT INTO archives VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+               ('sim_1', 'Jul-10-2025', slot, 'sim', 'SIM-1', path, os.path.getsize(path), None, etag, None, 'pending', 0))
+  db.commit()
+  db.close()
+
+  with Manifest() as manifest:
+    assert manifest.status('sim_1', 'Jul-10-2025', '0000Z') == 'unverified'
+    assert manifest.status('sim_1', 'Jul-10-2025', '0030Z') == 'complete'
@@ -0,0 +1,106 @@
+import os
+
+import librosa as lr
+import numpy as np
+import pytest
+import webrtcvad
+from scipy.signal import butter, sosfilt
+
+from audioProcess.metrics import AudioMetrics
+from audioProcess.streaming import decodeAudio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE = os.path.join(ROOT, 'downloads', 'sbrf', 'sbrf_12960', 'SBRF-App-12960-Jul-10-2025-0230Z.mp3')
+EPS = 1e-12
+
+
+def reference_compare(referenceAudio, processedAudio, sample_rate=16000):
+  """The original float64 AudioMetrics.audio_compare, with nothing cached."""
+  def rms(x):
+    return 20*np.log10(np.sqrt(np.mean(x**2) + EPS))
+
+  def vad_flags(x, frame_ms=30):
+    frame_length = int(np.round(sample_rate * frame_ms / 1000))
+    flags = np.zeros(int(np.ceil(len(x) / frame_length)), dtype=bool)
+    vad = webrtcvad.Vad(2)
+    audio_int16 = (np.clip(x, -1.0, 1.0) * 32767).astype(np.int16)
+    for i in range(len(flags)):
+      frame = np.zeros(frame_length, dtype=np.int16)
+      chunk = audio_int16[i * frame_length:(i + 1) * frame_length]
+      frame[:len(chunk)] = chunk
+      flags[i] = vad.is_speech(frame.tobytes(), sample_rate=sample_rate)
+    return flags, frame_length
+
+  def snr(nonspeech, speech, frameMs=30, hop=128):
+    flags, _ = vad_flags(nonspeech, frameMs)
+    pninput = np.abs(lr.stft(nonspeech, n_fft=512, hop_length=hop))**2
+    psoutput = np.abs(lr.stft(speech, n_fft=512, hop_length=hop))**2
+    frameLength = min(pninput.shape[1], psoutput.shape[1], int(np.ceil(len(nonspeech)/hop)))
+    frameMsStft = 1000.0 * hop / sample_rate
+    speechFrames = [frame for frame in range(frameLength)
+                    if flags[min(int(round((frame * frameMsStft) / frameMs)), len(flags) - 1)]]
+    monoSpeechFrames = list(set(range(frameLength)) - set(speechFrames))
+    if not monoSpeechFrames or not speechFrames:
+      return None, None, None
+    Npow = float(np.sum(np.mean(pninput[:, monoSpeechFrames], axis=1, keepdims=True) + EPS))
+    snrInput = float(np.mean([10 * np.log10((float(np.sum(pninput[:, f])) + EPS) / Npow) for f in speechFrames]))
+    snrOutput = float(np.mean([10 * np.log10((float(np.sum(psoutput[:, f])) + EPS) / Npow) for f in speechFrames]))
+    return snrInput, snrOutput, snrOutput - snrInput
+
+  def lsd(a, b):
+    refStft, targetStft = lr.stft(a, n_fft=512, hop_length=128), lr.stft(b, n_fft=512, hop_length=128)
+    n = min(refStft.shape[1], targetStft.shape[1])
+    diffDb = (20*np.log10(np.maximum(np.abs(refStft[:, :n]), EPS))
+              - 20*np.log10(np.maximum(np.abs(targetStft[:, :n]), EPS)))
+    lsdT = np.sqrt(np.mean(diffDb**2, axis=0))
+    return float(np.mean(lsdT)), float(np.median(lsdT))
+
+  def mfcc(a, b):
+    mfccRef = lr.feature.mfcc(y=a, sr=sample_rate, n_mfcc=13, hop_length=256)
+    mfccTarget = lr.feature.mfcc(y=b, sr=sample_rate, n_mfcc=13, hop_length=256)
+    n = min(mfccRef.shape[1], mfccTarget.shape[1])
+    distance = np.linalg.norm(mfccRef[:, :n] - mfccTarget[:, :n], axis=0)
+    return float(np.mean(distance)), float(np.median(distance))
+
+  numFrames = min(len(referenceAudio), len(processedAudio))
+  reference = np.array(referenceAudio[:numFrames], dtype=float)
+  processed = np.array(processedAudio[:numFrames], dtype=float)
+  maxDiff = max(np.max(np.abs(reference)), np.max(np.abs(processed)), 1.0)
+  reference /= maxDiff
+  processed /= maxDiff
+
+  flags, frameLength = vad_flags(referenceAudio)
+  mask = np.repeat(flags, frameLength)[:len(reference)]
+  nsInput, nsOutput = rms(reference[~mask]), rms(processed[~mask])
+  spInput, spOutput = rms(reference[mask]), rms(processed[mask])
+  snrInput, snrOutput, snrDelta = snr(reference, processed)
+  lsdMeanDb, lsdMedDb = lsd(reference, processed)
+  mfccMean, mfccMed = mfcc(reference, processed)
+  return {
+      "nsRmsInputDb": nsInput, "nsRmsOutputDb": nsOutput, "nsReductionDb": nsInput - nsOutput,
+      "spRmsInputDb": spInput, "spRmsOutputDb": spOutput, "speechLevelDeltaDb": spInput - spOutput,
+      "snrInput": snrInput, "snrOutput": snrOutput, "snrDelta": snrDelta,
+      "lsdMeanDb": lsdMeanDb, "lsdMedDb": lsdMedDb, "mfccMean": mfccMean, "mfccMed": mfccMed,
+  }
+
+
+@pytest.fixture(scope='module')
+def excerpt():
+  # Two minutes of a real approach feed, decoded to float32 as the PCM cache returns it.
+  return decodeAudio(ARCHIVE, 16000)[:120 * 16000]
+
+
+def processed_versions(audio):
+  sos = butter(4, [250, 3400], btype='bandpass', fs=16000, output='sos')
+  filtered = sosfilt(sos, audio).astype(np.float32)
+  gated = np.where(np.abs(filtered) > 0.05, filtered, filtered * 1e-4).astype(np.float32)
+  return [filtered, gated * 1.5]
+
+
+def test_audio_compare_is_identical_to_the_float64_reference(excerpt):
+  metrics = AudioMetrics(None, 16000)
+  reference_cache = {}
+  for processed in processed_versions(excerpt):
+    expected = reference_compare(excerpt, processed)
+    assert metrics.audio_compare(excerpt, processed) == expected
+    assert metrics.audio_compare(excerpt, processed, reference_cache) == expected
@@ -0,0 +1,98 @@
+import os
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audioProcess import pcmcache
+from audioProcess.pcmcache import PcmCache
+from audioProcess.streaming import decodeAudio
+
+
+@pytest.fixture
+def wavs(tmp_path):
+  rng = np.random.default_rng(0)
+  paths = []
+  for i in range(3):
+    path = str(tmp_path / f"slot{i}.wav")
+    sf.write(path, rng.uniform(-0.5, 0.5, 16000 * 2).astype(np.float32), 16000)
+    paths.append(path)
+  return paths
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+  calls = []
+
+  def counting(path, sample_rate=16000):
+    calls.append(path)
+    return decodeAudio(path, sample_rate)
+
+  monkeypatch.setattr(pcmcache, 'decodeAudio', counting)
+  return calls
+
+
+def entries(cache):
+  return sorted(name for name in os.listdir(cache.cache_dir) if name.endswith('.npy'))
+
+
+def test_hit_returns_the_decoded_samples_memory_mapped(tmp_path, wavs, decodes):
+  cache = PcmCache(str(tmp_path / 'pcm'))
+  first, rate = cache.load(wavs[0])
+  second, _ = cache.load(wavs[0])
+
+  assert rate == 16000
+  assert decodes == [wavs[0]]
+  assert isinstance(first, np.memmap) and isinstance(second, np.memmap) and not second.flags.writeable
+  np.testing.assert_array_equal(second, decodeAudio(wavs[0], 16000))
+  assert entries(cache) == [os.path.basename(cache.entryPath(wavs[0], 16000))]
+
+
+def test_evicts_old_entries_then_least_recently_used(tmp_path, wavs, decodes):
+  cache = PcmCache(str(tmp_path / 'pcm'), max_bytes=10**9, max_age=3600)
+  for path in wavs:
+    cache.load(path)
+  entry_size = os.path.getsize(cache.entryPath(wavs[0], 16000))
+
+  old = time.time() - 7200
+  os.utime(cache.entryPath(wavs[0], 16000), (old, old))
+  cache.evict()
+  assert entries(cache) == sorted(os.path.basename(cache.entryPath(path, 16000)) for path in wavs[1:])
+
+  # wavs[1] is used again, so wavs[2] is now the least recently used.
+  os.utime(cache.entryPath(wavs[2], 16000), (old + 3000, old + 3000))
+  cache.load(wavs[1])
+  cache.max_bytes = entry_size
+  cache.evict()
+  assert entries(cache) == [os.path.basename(cache.entryPath(wavs[1], 16000))]
+
+
+def test_concurrent_eviction_is_tolerated(tmp_path, wavs, decodes, monkeypatch):
+  cache = PcmCache(str(tmp_path / 'pcm'), max_bytes=0)
+  real_remove = os.remove
+
+  def remove_after_another_worker(path):
+    real_remove(path)
+    real_remove(path)
+
+  # Every entry is evicted as soon as it is written, and each removal races with another worker's.
+  monkeypatch.setattr(pcmcache.os, 'remove', remove_after_another_worker)
+  audio, _ = cache.load(wavs[0])
+  np.testing.assert_array_equal(audio, decodeAudio(wavs[0], 16000))
+  assert entries(cache) == []
+
+  # An entry found on disk but gone before it is opened is decoded again.
+  monkeypatch.setattr(pcmcache.os, 'remove', real_remove)
+  cache.max_bytes = 10**9
+  cache.load(wavs[1])
+  real_utime = os.utime
+
+  def evicted_meanwhile(path, *args):
+    real_remove(path)
+    real_utime(path, *args)
+
+  monkeypatch.setattr(pcmcache.os, 'utime', evicted_meanwhile)
+  audio, _ = cache.load(wavs[1])
+  np.testing.assert_array_equal(audio, decodeAudio(wavs[1], 16000))
+  assert decodes == [wavs[0], wavs[1], wavs[1]]
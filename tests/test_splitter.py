@@ -0,0 +1,45 @@
+import csv
+import os
+
+from audioProcess.splitter import splitArchives
+
+ARCHIVE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'downloads', 'sbrf', 'sbrf_11835',
+                       'SBRF-Twr-Jul-10-2025-0000Z.mp3')
+
+
+def read_index(path):
+  with open(path, newline='') as f:
+    return list(csv.DictReader(f))
+
+
+def test_split_is_idempotent_and_replaces_stale_clips(tmp_path):
+  clips_dir = str(tmp_path / 'clips')
+  index_path = str(tmp_path / 'index.csv')
+
+  def split(**kwargs):
+    return splitArchives([ARCHIVE], lambda _: clips_dir, index_path, workers=2, noise_reduce=False, **kwargs)
+
+  def clip_files():
+    return sorted(name for name in os.listdir(clips_dir) if name.endswith('.wav'))
+
+  total, skipped = split()
+  rows = read_index(index_path)
+  assert total == len(rows) > 0 and skipped == 0
+  assert clip_files() == sorted(os.path.basename(row['clip']) for row in rows)
+
+  # Same options: nothing is exported again and the index keeps one row per clip.
+  mtimes = {name: os.path.getmtime(os.path.join(clips_dir, name)) for name in clip_files()}
+  assert split() == (total, 1)
+  assert read_index(index_path) == rows
+  assert {name: os.path.getmtime(os.path.join(clips_dir, name)) for name in clip_files()} == mtimes
+
+  # New options: the archive is cut again and no clip or row of the previous run is left.
+  total, skipped = split(padding_ms=2000)
+  new_rows = read_index(index_path)
+  assert skipped == 0 and total == len(new_rows) < len(rows)
+  assert clip_files() == sorted(os.path.basename(row['clip']) for row in new_rows)
+
+  # A lost index is rebuilt from the per-archive record without cutting again.
+  os.remove(index_path)
+  assert split(padding_ms=2000) == (total, 1)
+  assert read_index(index_path) == new_rows
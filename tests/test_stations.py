@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import liveatc
+from benchmarks.archive_server import ArchiveServer
+
+TOWER = {'identifier': 'sbrf_11835', 'title': 'SBRF Tower', 'up': True,
+         'frequencies': [{'title': 'Tower', 'frequency': '118.350'}]}
+GROUND = {'identifier': 'sbrf_gnd', 'title': 'SBRF Ground', 'up': False,
+          'frequencies': [{'title': 'Ground', 'frequency': '121.900'}, {'title': 'Clearance', 'frequency': '121.650'}]}
+APPROACH = {'identifier': 'sbsp_app', 'title': 'SBSP Approach', 'up': True,
+            'frequencies': [{'title': 'Approach', 'frequency': '119.800'}]}
+
+
+@pytest.fixture
+def search(tmp_path, monkeypatch):
+  with ArchiveServer(search={'SBRF': [TOWER, GROUND], 'SBSP': [APPROACH]}) as server:
+    monkeypatch.setattr(liveatc, 'SEARCH_URL', server.url + '/search/')
+    monkeypatch.setattr(liveatc, 'CACHE_DIR', str(tmp_path / 'cache'))
+    yield server
+
+
+def cached(icao):
+  with open(liveatc._stations_cache_path(icao)) as f:
+    return json.load(f)
+
+
+def test_fresh_entries_are_served_from_disk(search):
+  assert liveatc.get_stations('SBRF') == [TOWER, GROUND]
+  assert cached('SBRF')['etag'] and cached('SBRF')['last_modified']
+
+  assert liveatc.get_stations('sbrf') == [TOWER, GROUND]
+  assert search.statuses == {200: 1}
+
+
+def test_stale_entries_are_revalidated_with_a_304(search):
+  liveatc.get_stations('SBRF')
+  fetched_at = cached('SBRF')['fetched_at']
+
+  assert liveatc.get_stations('SBRF', ttl=0) == [TOWER, GROUND]
+  assert search.statuses == {200: 1, 304: 1}
+  assert cached('SBRF')['fetched_at'] > fetched_at
+
+  # A changed page no longer matches the ETag and is downloaded and parsed again.
+  search.search['SBRF'] = [TOWER]
+  assert liveatc.get_stations('SBRF', ttl=0) == [TOWER]
+  assert search.statuses == {200: 2, 304: 1}
+  assert cached('SBRF')['stations'] == [TOWER]
+
+
+def test_refresh_downloads_unconditionally(search):
+  liveatc.get_stations('SBRF')
+  search.search['SBRF'] = [GROUND]
+
+  assert liveatc.get_stations('SBRF', refresh=True) == [GROUND]
+  assert search.statuses == {200: 2}
+
+
+def test_many_fetches_only_what_is_not_fresh(search):
+  liveatc.get_stations('SBRF')
+  search.statuses.clear()
+
+  results = liveatc.get_stations_many(['SBRF', 'SBSP', 'XXXX'])
+  assert results['SBRF'] == [TOWER, GROUND] and results['SBSP'] == [APPROACH]
+  assert isinstance(results['XXXX'], Exception)
+  assert search.statuses == {200: 1, 404: 1}
+
+  search.statuses.clear()
+  assert liveatc.get_stations_many(['SBRF', 'SBSP'])['SBSP'] == [APPROACH]
+  assert search.statuses == {}
+
+  assert liveatc.get_stations_many(['SBRF', 'SBSP'], ttl=0)['SBRF'] == [TOWER, GROUND]
+  assert search.statuses == {304: 2}
+
+  liveatc.get_stations_many(['SBRF'], refresh=True)
+  assert search.statuses == {304: 2, 200: 1}
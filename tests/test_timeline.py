@@ -0,0 +1,43 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audioProcess.timeline import assembleTimeline, indexPathFor, timelineBlocks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE = os.path.join(ROOT, 'downloads', 'sbrf', 'sbrf_11835', 'SBRF-Twr-Jul-10-2025-0000Z.mp3')
+
+
+@pytest.fixture
+def short_wav(tmp_path):
+  path = str(tmp_path / 'short.wav')
+  sf.write(path, np.full(16000 * 7, 0.25, dtype=np.float32), 16000)
+  return path
+
+
+def test_every_source_fills_exactly_one_slot(short_wav):
+  spans = []
+  sources = [('0000Z', ARCHIVE), ('0030Z', None), ('0100Z', short_wav)]
+  audio = np.concatenate(list(timelineBlocks(sources, 16000, block_seconds=4.0, spans=spans, slot_seconds=20)))
+
+  assert len(audio) == 3 * 20 * 16000
+  assert [(span['start'], span['end']) for span in spans] == [(0, 320000), (320000, 640000), (640000, 960000)]
+  # The archive is longer than its slot and is cut; the short file is padded with silence.
+  assert spans[0]['decoded_seconds'] > 20 and spans[1]['decoded_seconds'] is None
+  assert spans[2]['decoded_seconds'] == 7.0
+  assert not audio[320000:640000].any()
+  assert (audio[640000:640000 + 7 * 16000] == 0.25).all() and not audio[640000 + 7 * 16000:].any()
+
+
+def test_index_places_slots_at_wall_clock_offsets(tmp_path, short_wav):
+  output = str(tmp_path / 'timeline.npy')
+  sources = [('0000Z', ARCHIVE), ('0030Z', None), ('0100Z', short_wav)]
+  index = assembleTimeline(sources, output, slot_seconds=30)
+
+  assert [(source['start'], source['end']) for source in index['sources']] == [(0, 30), (30, 60), (60, 90)]
+  assert len(np.load(output, mmap_mode='r')) == 90 * 16000
+  with open(indexPathFor(output, 'memmap')) as f:
+    assert json.load(f)['sources'] == index['sources']